@@ -11,6 +11,8 @@ import typing
 
 import pygame
 
+import helper
+
 SPEED: int = 4
 
 T = typing.TypeVar("T")
@@ -97,6 +99,20 @@ class LoopableIter(typing.Iterator[T]):
         """Getter for the loopable attribute of this LoopableIter"""
         return self.__loopable
 
+    @property
+    def state(self) -> typing.Tuple[int, int, int, bool]:
+        """Getter for the state attribute of this LoopableIter, the current item and loop state as a tuple"""
+        return (self.__current_item, int(self.__loop_state.loop_type), self.__loop_state.iterations,
+                self.__loop_state.direction)
+
+    @state.setter
+    def state(self, value: typing.Tuple[int, int, int, bool]):
+        """Setter for the state attribute of this LoopableIter"""
+        current_item, loop_type, iterations, direction = value
+
+        self.__current_item = current_item
+        self.__loop_state = LoopState(LoopType(loop_type), iterations, direction)
+
     def __next__(self) -> T:
         """__next__ method for this LoopableIter"""
 
@@ -159,7 +175,7 @@ class Section(Loopable[pygame.Surface]):
         for files in os.walk(path):
             return cls(
                 tuple(
-                    pygame.image.load(os.path.join(files[0], file))
+                    helper.load_image(os.path.join(files[0], file))
                     for file in sorted(files[2])
                 ),
                 loop_state
@@ -187,11 +203,54 @@ class Animation(Loopable[Section]):
 
         self.sections = sections
 
+        self.__frame_indices: typing.Optional[typing.Dict[pygame.Surface, typing.Tuple[int, int]]] = None
+
+    def frame_index(self, frame: pygame.Surface) -> typing.Tuple[int, int]:
+        """Returns the section and frame index of a frame of this Animation, (-1, -1) if it is not in it"""
+        if self.__frame_indices is None:
+            self.__frame_indices = {
+                section_frame: (section_index, frame_index)
+                for section_index, section in enumerate(self.sections)
+                for frame_index, section_frame in enumerate(section.frames)
+            }
+
+        return self.__frame_indices.get(frame, (-1, -1))
+
     @property
     def array(self) -> list:
         """Getter for the array attribute of this Animation"""
         return self.sections
 
+    @classmethod
+    def from_frames(cls, frames: typing.Sequence[typing.Tuple[pygame.Surface, ...]],
+                    loop_state: typing.Optional[LoopState] = None,
+                    section_loopstates: typing.Optional[typing.List[LoopState]] = None):
+        """Makes a animation from the frames of each section"""
+        if section_loopstates is None:
+            section_loopstates = [LoopState() for _ in range(len(frames))]
+
+        return cls(
+            [
+                Section(tuple(section_frames), section_loopstate)
+                for section_frames, section_loopstate in zip(frames, section_loopstates)
+            ],
+            loop_state
+        )
+
+    @staticmethod
+    def frame_paths(path: str) -> typing.List[typing.List[str]]:
+        """Paths of the frames of each section of a animation directory, in the order of from_directory"""
+        paths = []
+
+        for files in os.walk(path):
+            for directory in sorted(files[1]):
+                for section_files in os.walk(os.path.join(files[0], directory)):
+                    paths.append([os.path.join(section_files[0], file) for file in sorted(section_files[2])])
+                    break
+            break
+
+        return paths
+
     @classmethod
     def from_directory(cls, path: str,
                        loop_state: typing.Optional[LoopState] = None,
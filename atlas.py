@@ -0,0 +1,101 @@
+"""Texture atlases"""
+
+import typing
+
+import pygame
+
+
+class Atlas:
+    """A class representing texture atlases, frames packed into a few sheets with the rect of every frame"""
+
+    SIZE: typing.Tuple[int, int] = (1024, 1024)
+    PADDING: int = 1
+
+    def __init__(self, sheets: typing.List[pygame.Surface], rects: typing.List[typing.Tuple[int, pygame.Rect]]):
+        """
+        Initializer for the Atlas class
+        sheets: the surfaces the frames are packed into
+        rects: the sheet index and source rect of every frame
+        """
+        self.__sheets: typing.List[pygame.Surface] = sheets
+        self.__rects: typing.List[typing.Tuple[int, pygame.Rect]] = rects
+
+        self.__frames: typing.Tuple[pygame.Surface, ...] = tuple(
+            self.__sheets[sheet].subsurface(rect) for sheet, rect in self.__rects
+        )
+
+    @classmethod
+    def pack(cls, frames: typing.Sequence[pygame.Surface], size: typing.Tuple[int, int] = SIZE,
+             padding: int = PADDING):
+        """
+        Packs frames into sheets of at most size, tallest first on shelves from left to right
+        Frames bigger than size get a sheet of their own
+        """
+        order = sorted(range(len(frames)), key=lambda index: frames[index].get_height(), reverse=True)
+
+        positions: typing.List[typing.Optional[typing.Tuple[int, int, int]]] = [None] * len(frames)
+        sheet_sizes: typing.List[typing.List[int]] = []
+
+        x, y, shelf_height = 0, 0, 0
+
+        for index in order:
+            width, height = frames[index].get_size()
+
+            # Next shelf
+            if sheet_sizes and x + width > size[0]:
+                x, y = 0, y + shelf_height + padding
+                shelf_height = 0
+
+            # Next sheet
+            if not sheet_sizes or y + height > size[1] and y > 0:
+                sheet_sizes.append([0, 0])
+                x, y, shelf_height = 0, 0, 0
+
+            positions[index] = (len(sheet_sizes) - 1, x, y)
+
+            sheet_size = sheet_sizes[-1]
+            sheet_size[0] = max(sheet_size[0], x + width)
+            sheet_size[1] = max(sheet_size[1], y + height)
+
+            x += width + padding
+            shelf_height = max(shelf_height, height)
+
+        sheets = [pygame.Surface((max(width, 1), max(height, 1)), pygame.SRCALPHA) for width, height in sheet_sizes]
+        rects = []
+
+        for frame, (sheet, x, y) in zip(frames, positions):
+            # The sheets start fully transparent, so taking the maximum copies the frame exactly
+            sheets[sheet].blit(frame, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+            rects.append((sheet, pygame.Rect((x, y), frame.get_size())))
+
+        if pygame.display.get_surface() is not None:
+            sheets = [sheet.convert_alpha() for sheet in sheets]
+
+        return cls(sheets, rects)
+
+    @property
+    def sheets(self) -> typing.List[pygame.Surface]:
+        """Getter for the sheets attribute of this Atlas"""
+        return self.__sheets
+
+    @property
+    def rects(self) -> typing.List[typing.Tuple[int, pygame.Rect]]:
+        """Getter for the rects attribute of this Atlas"""
+        return self.__rects
+
+    @property
+    def frames(self) -> typing.Tuple[pygame.Surface, ...]:
+        """Getter for the frames attribute of this Atlas, subsurfaces of the sheets in the order they were packed"""
+        return self.__frames
+
+    def masks(self) -> typing.List[pygame.mask.Mask]:
+        """Returns the mask of every frame, made from one mask of each sheet"""
+        sheet_masks = [pygame.mask.from_surface(sheet) for sheet in self.__sheets]
+        masks = []
+
+        for sheet, rect in self.__rects:
+            mask = pygame.mask.Mask(rect.size)
+            mask.draw(sheet_masks[sheet], (-rect.x, -rect.y))
+            masks.append(mask)
+
+        return masks
@@ -0,0 +1,174 @@
+"""Framebuffer capture and recording"""
+
+import zlib
+import queue
+import struct
+import typing
+import threading
+import contextlib
+
+import numpy
+import pygame
+
+
+class Capture:
+    """A class representing captures, which expose the pixels of a surface without copying them"""
+
+    def __init__(self, surface: pygame.Surface):
+        """Initializer for the Capture class"""
+        self.surface: pygame.Surface = surface
+
+    @contextlib.contextmanager
+    def pixels(self) -> typing.Iterator[numpy.ndarray]:
+        """
+        A view of the pixels of the surface, indexed by x, y then RGB
+        The surface is locked while the view is used, so it could not be drawn on until the block ends
+        """
+        view = pygame.surfarray.pixels3d(self.surface)
+
+        try:
+            yield view
+        finally:
+            del view
+
+    def factor(self, size: typing.Tuple[int, int]) -> typing.Tuple[int, int]:
+        """Returns the downsampling factor for a size, which must divide the size of the surface"""
+        width, height = self.surface.get_size()
+
+        if width % size[0] or height % size[1]:
+            raise ValueError("%dx%d does not divide %dx%d" % (size[0], size[1], width, height))
+
+        return width // size[0], height // size[1]
+
+    def downsample(self, out: numpy.ndarray) -> numpy.ndarray:
+        """Copy every nth pixel into out, whose first two dimensions must divide the size of the surface"""
+        x, y = self.factor(out.shape[:2])
+
+        with self.pixels() as pixels:
+            numpy.copyto(out, pixels[::x, ::y])
+
+        return out
+
+    def copy(self, out: numpy.ndarray) -> numpy.ndarray:
+        """Copy the pixels into out, indexed by y, x then RGB like most video formats"""
+        with self.pixels() as pixels:
+            numpy.copyto(out, pixels.transpose(1, 0, 2))
+
+        return out
+
+
+class Recorder:
+    """
+    A class representing recorders, which write frames from a background thread
+    Frames are copied into a fixed pool of buffers, if every buffer is waiting to be written the frame is dropped
+    instead of waiting for the writer
+    """
+
+    MAGIC: bytes = b"JPRV"
+    HEADER = struct.Struct("<4sIII?")
+    FRAME = struct.Struct("<I")
+
+    def __init__(self, path: str, size: typing.Tuple[int, int], compress: bool = True, buffers: int = 8,
+                 level: int = 1):
+        """
+        Initializer for the Recorder class
+        size: the size of the recorded surface
+        compress: compress every frame with zlib if True, write raw RGB frames if False
+        buffers: the amount of frames that could wait to be written
+        level: the zlib compression level
+        """
+        self.path: str = path
+        self.size: typing.Tuple[int, int] = size
+        self.compress: bool = compress
+        self.level: int = level
+
+        self.__free: "queue.SimpleQueue[numpy.ndarray]" = queue.SimpleQueue()
+        self.__written: "queue.SimpleQueue[typing.Optional[numpy.ndarray]]" = queue.SimpleQueue()
+
+        for _ in range(buffers):
+            self.__free.put(numpy.empty((size[1], size[0], 3), numpy.uint8))
+
+        self.__thread: typing.Optional[threading.Thread] = None
+
+        self.frames: int = 0
+        self.dropped: int = 0
+
+    def __enter__(self):
+        """__enter__ method for this Recorder"""
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        """__exit__ method for this Recorder"""
+        self.close()
+
+    def start(self) -> None:
+        """Start the writer thread"""
+        self.__thread = threading.Thread(target=self.__write_frames, name="Recorder", daemon=True)
+        self.__thread.start()
+
+    def write(self, surface: pygame.Surface) -> bool:
+        """Queue a frame to be written, returns False if it was dropped"""
+        try:
+            buffer = self.__free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+
+        Capture(surface).copy(buffer)
+
+        self.__written.put(buffer)
+        self.frames += 1
+
+        return True
+
+    def close(self) -> None:
+        """Write the queued frames and stop the writer thread"""
+        if self.__thread is not None:
+            self.__written.put(None)
+            self.__thread.join()
+            self.__thread = None
+
+    def __write_frames(self) -> None:
+        """write_frames method for this Recorder, runs in the writer thread"""
+        with open(self.path, "wb") as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.size[0], self.size[1], 3, self.compress))
+
+            while True:
+                buffer = self.__written.get()
+
+                if buffer is None:
+                    break
+
+                # zlib and file writes release the GIL, so the game keeps running
+                if self.compress:
+                    data = zlib.compress(memoryview(buffer), self.level)
+                else:
+                    data = memoryview(buffer)
+
+                file.write(self.FRAME.pack(len(data)))
+                file.write(data)
+
+                self.__free.put(buffer)
+
+
+def read_frames(path: str) -> typing.Iterator[numpy.ndarray]:
+    """Read the frames of a recording, indexed by y, x then RGB"""
+    with open(path, "rb") as file:
+        magic, width, height, channels, compress = Recorder.HEADER.unpack(file.read(Recorder.HEADER.size))
+
+        if magic != Recorder.MAGIC:
+            raise ValueError("%s is not a recording" % path)
+
+        while True:
+            header = file.read(Recorder.FRAME.size)
+
+            if len(header) < Recorder.FRAME.size:
+                return
+
+            data = file.read(Recorder.FRAME.unpack(header)[0])
+
+            if compress:
+                data = zlib.decompress(data)
+
+            yield numpy.frombuffer(data, numpy.uint8).reshape((height, width, channels))
@@ -0,0 +1,82 @@
+"""Input handling with latency measurement"""
+
+import time
+import typing
+
+import pygame
+
+import sprites
+
+
+class Controls:
+    """
+    A class representing controls, the input of a player read as late as possible before the world steps
+    Only the event types the game handles are queued, and the time every input arrived is kept,
+    so the latency from an input to the frame showing it being flipped can be measured
+    """
+
+    ALLOWED: typing.Tuple[int, ...] = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP)
+
+    def __init__(self, key: int = pygame.K_SPACE):
+        """
+        Initializer for the Controls class
+        key: the key held to fly
+        """
+        self.key: int = key
+
+        self.quit: bool = False
+
+        self.__events: typing.List[typing.Tuple[float, pygame.event.EventType]] = []
+        self.__latched: typing.List[float] = []
+
+    def allow(self) -> None:
+        """Only queue the event types the game handles, every other event is dropped by SDL"""
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(self.ALLOWED))
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep for at most some seconds, waking up on every input to keep the time it arrived, used by Pacer.wait"""
+        deadline = time.perf_counter() + seconds
+
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            # A timeout of 0 would wait forever
+            event = pygame.event.wait(max(int(remaining * 1000), 1))
+            if event.type == pygame.NOEVENT:
+                break
+
+            self.__events.append((time.perf_counter(), event))
+
+    def latch(self, player: sprites.Player) -> bool:
+        """Apply every input that arrived to a player, returns False once the game should quit"""
+        now = time.perf_counter()
+        self.__events.extend((now, event) for event in pygame.event.get())
+
+        for arrived, event in self.__events:
+            if event.type == pygame.QUIT:
+                self.quit = True
+
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key == self.key:
+                player.input = event.type == pygame.KEYDOWN
+                self.__latched.append(arrived)
+
+        self.__events.clear()
+
+        return not self.quit
+
+    def presented(self) -> typing.Optional[float]:
+        """
+        Call once the frame was flipped, returns the longest latency in milliseconds of the inputs it showed, to record
+        in Telemetry.frame
+        Returns None if the frame showed no new input
+        """
+        if not self.__latched:
+            return None
+
+        latency = (time.perf_counter() - min(self.__latched)) * 1000
+        self.__latched.clear()
+
+        return latency
@@ -0,0 +1,70 @@
+"""Difficulty curves"""
+
+import bisect
+import typing
+
+
+class Tier(typing.NamedTuple):
+    """A class representing difficulty tiers"""
+
+    # The distance in pixels the tier starts at
+    distance: int
+
+    # The pixels the world scrolls per frame
+    speed: int
+
+    # The range of the distance in pixels between zapper spawns
+    zapper_spacings: typing.Tuple[int, int]
+
+    # The amount of zappers spawned at once
+    pattern: int
+
+    # The chance a zapper is spawned at a random angle
+    angle_chance: float = 0.0
+
+    # The most degrees an angled zapper rotates each frame
+    spin: float = 0.0
+
+    # The range of the length of zappers that are not angled, the length of their images if None
+    lengths: typing.Optional[typing.Tuple[int, int]] = None
+
+
+class Difficulty:
+    """
+    A class representing difficulty curves, tiers that get harder with distance
+    The spacing of every tier is large enough that at most max_zappers zappers are ever on the screen,
+    so the cost of a frame stays bounded at the top tier
+    """
+
+    TIERS: typing.Tuple[Tier, ...] = (
+        Tier(0, 8, (300, 500), 1),
+        Tier(10000, 10, (300, 450), 1),
+        Tier(25000, 12, (350, 450), 2),
+        Tier(50000, 14, (400, 500), 2, 0.25, 0.0, (160, 360)),
+        Tier(100000, 16, (700, 800), 3, 0.4, 2.0, (160, 400))
+    )
+
+    def __init__(self, tiers: typing.Sequence[Tier] = TIERS, screen_width: int = 1000, max_zappers: int = 12):
+        """
+        Initializer for the Difficulty class
+        max_zappers: the most zappers a tier is allowed to put on the screen at once
+        """
+        self.tiers: typing.Tuple[Tier, ...] = tuple(sorted(tiers))
+        self.__distances: typing.List[int] = [tier.distance for tier in self.tiers]
+
+        for tier in self.tiers:
+            # A zapper is on the screen for about the width of the screen, plus its own width
+            on_screen = (screen_width * 2 // tier.zapper_spacings[0] + 1) * tier.pattern
+
+            if on_screen > max_zappers:
+                raise ValueError("Tier %r could put %d zappers on the screen, the most is %d" %
+                                 (tier, on_screen, max_zappers))
+
+    @property
+    def top(self) -> Tier:
+        """Getter for the top attribute of this Difficulty, the hardest tier"""
+        return self.tiers[-1]
+
+    def tier(self, distance: int) -> Tier:
+        """Returns the tier at a distance in pixels"""
+        return self.tiers[max(bisect.bisect_right(self.__distances, distance) - 1, 0)]
@@ -0,0 +1,234 @@
+"""Reinforcement learning environments"""
+
+import typing
+
+import numpy
+import pygame
+
+import render
+import capture
+import loading
+import sprites
+import world
+
+# Actions
+FALL = 0
+FLY = 1
+
+# Observation types
+FEATURES = "features"
+FRAMEBUFFER = "framebuffer"
+
+
+class Agent(sprites.Player):
+    """A class representing agent sprites, players controlled by an environment, inherits from Player"""
+
+    SILENT = True
+
+    def act(self, action: int) -> None:
+        """Fly or fall, only changes the flying state on a new input, like a key press"""
+        self.input = action == FLY
+
+
+class Environment:
+    """
+    A class representing environments, one world with one agent
+    Follows the gym interface, reset returns an observation and step returns (observation, reward, done, info)
+    """
+
+    SCREEN_SIZE: typing.Tuple[int, int] = (1000, 480)
+
+    # The amount of zappers ahead of the agent in feature observations
+    ZAPPERS: int = 3
+
+    def __init__(self, observation: str = FEATURES, framebuffer_size: typing.Tuple[int, int] = (100, 48),
+                 screen_size: typing.Tuple[int, int] = SCREEN_SIZE):
+        """
+        Initializer for the Environment class
+        observation: FEATURES for a vector of the agent and the zappers ahead, FRAMEBUFFER for a downsampled screen
+        framebuffer_size: the size of framebuffer observations
+        """
+        if observation not in (FEATURES, FRAMEBUFFER):
+            raise ValueError("Unknown observation type %r" % observation)
+
+        loading.load_all()
+
+        self.observation: str = observation
+        self.framebuffer_size: typing.Tuple[int, int] = framebuffer_size
+
+        self.screen: pygame.Surface = pygame.Surface(screen_size)
+        self.renderer: render.Renderer = render.Renderer()
+
+        self.capture: capture.Capture = capture.Capture(self.screen)
+
+        # Framebuffer observations take every nth pixel, so their size must divide the screen size
+        if observation == FRAMEBUFFER:
+            self.capture.factor(framebuffer_size)
+
+        self.world: typing.Optional[world.World] = None
+        self.agent: typing.Optional[Agent] = None
+        self.scoreboard: typing.Optional[sprites.Scoreboard] = None
+
+    @property
+    def observation_shape(self) -> typing.Tuple[int, ...]:
+        """Getter for the observation_shape attribute of this Environment"""
+        if self.observation == FRAMEBUFFER:
+            return self.framebuffer_size[0], self.framebuffer_size[1], 3
+
+        return 3 + 4 * self.ZAPPERS,
+
+    @property
+    def observation_dtype(self) -> numpy.dtype:
+        """Getter for the observation_dtype attribute of this Environment"""
+        return numpy.dtype(numpy.uint8 if self.observation == FRAMEBUFFER else numpy.float32)
+
+    def reset(self, seed: typing.Optional[int] = None) -> numpy.ndarray:
+        """Start a new run, in the world of the last one if there was one, returns the first observation"""
+        if self.world is None:
+            self.world = world.World(self.screen, seed, exhaust=False)
+        else:
+            self.world.reset(seed)
+
+        self.agent = self.world.spawn_player(Agent)
+        self.scoreboard = self.world.scoreboards[self.agent]
+
+        return self.observe()
+
+    def step(self, action: int) -> typing.Tuple[numpy.ndarray, float, bool, dict]:
+        """Advance the run by one frame with an action, FLY or FALL"""
+        pixels = self.scoreboard.pixels
+
+        self.agent.act(action)
+        self.world.step()
+
+        reward = float(self.scoreboard.pixels - pixels)
+
+        return self.observe(), reward, self.agent.dead, self.info()
+
+    def info(self) -> dict:
+        """Returns the info of the current frame"""
+        return {"ticks": self.world.ticks, "distance": self.scoreboard.distance}
+
+    def observe(self, out: typing.Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        """Returns the observation of the current frame, written into out if it is given"""
+        if out is None:
+            out = numpy.empty(self.observation_shape, self.observation_dtype)
+
+        if self.observation == FRAMEBUFFER:
+            self.observe_framebuffer(out)
+        else:
+            self.observe_features(out)
+
+        return out
+
+    def observe_framebuffer(self, out: numpy.ndarray) -> None:
+        """Draw the world and downsample it into out"""
+        self.renderer.draw(self.screen, self.world.game_sprites)
+        self.capture.downsample(out)
+
+    def observe_features(self, out: numpy.ndarray) -> None:
+        """
+        Write the features of the world into out
+        The top and vertical speed of the agent and whether it is dead,
+        then the offset from the agent and the size of the closest zappers ahead of it
+        """
+        width, height = self.screen.get_size()
+        agent = self.agent.rect
+
+        out[0] = agent.top / height
+        out[1] = self.agent.dy / 10
+        out[2] = self.agent.dead
+
+        # Zappers are in the order they were spawned, which is from left to right
+        zappers = [zapper.rect for zapper in self.world.zappers if zapper.rect.right >= agent.left][:self.ZAPPERS]
+
+        for index in range(self.ZAPPERS):
+            features = out[3 + index * 4:7 + index * 4]
+
+            if index < len(zappers):
+                rect = zappers[index]
+                features[0] = (rect.left - agent.right) / width
+                features[1] = (rect.top - agent.top) / height
+                features[2] = rect.width / width
+                features[3] = rect.height / height
+            else:
+                features[:] = (1, 0, 0, 0)
+
+
+class VectorEnvironment:
+    """
+    A class representing vector environments, independent environments stepped in lockstep
+    Environments that are done are reset automatically, the info of their last frame has reset set to True and the
+    observation of that frame as terminal_observation
+    """
+
+    def __init__(self, amount: int, observation: str = FEATURES, **kwargs):
+        """
+        Initializer for the VectorEnvironment class
+        amount: the amount of environments
+        """
+        self.environments: typing.List[Environment] = [
+            Environment(observation=observation, **kwargs) for _ in range(amount)
+        ]
+
+        environment = self.environments[0]
+
+        # The buffers are reused every step
+        self.__observations = numpy.empty((amount,) + environment.observation_shape, environment.observation_dtype)
+        self.__rewards = numpy.zeros(amount, numpy.float32)
+        self.__dones = numpy.zeros(amount, numpy.bool_)
+
+        self.__seed: typing.Optional[int] = None
+
+    def __len__(self) -> int:
+        """__len__ method for this VectorEnvironment"""
+        return len(self.environments)
+
+    def __next_seed(self) -> typing.Optional[int]:
+        """next_seed method for this VectorEnvironment"""
+        if self.__seed is None:
+            return None
+
+        self.__seed += 1
+        return self.__seed
+
+    def reset(self, seed: typing.Optional[int] = None) -> numpy.ndarray:
+        """Start a new run in every environment, seeded with seed, seed + 1 and so on if seed is given"""
+        self.__seed = None if seed is None else seed - 1
+
+        for index, environment in enumerate(self.environments):
+            environment.reset(self.__next_seed())
+            environment.observe(self.__observations[index])
+
+        return self.__observations
+
+    def step(self, actions: typing.Sequence[int]) -> typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray,
+                                                                  typing.List[dict]]:
+        """
+        Advance every environment by one frame with its action
+        The returned arrays are reused by the next step, copy them to keep them
+        """
+        infos = []
+
+        for index, (environment, action) in enumerate(zip(self.environments, actions)):
+            pixels = environment.scoreboard.pixels
+
+            environment.agent.act(action)
+            environment.world.step()
+
+            self.__rewards[index] = environment.scoreboard.pixels - pixels
+            done = self.__dones[index] = environment.agent.dead
+
+            info = environment.info()
+
+            info["reset"] = bool(done)
+
+            # The observation of the last frame of a run, as the one returned is the first of the next run
+            if done:
+                info["terminal_observation"] = environment.observe()
+                environment.reset(self.__next_seed())
+
+            environment.observe(self.__observations[index])
+            infos.append(info)
+
+        return self.__observations, self.__rewards, self.__dones, infos
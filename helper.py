@@ -12,20 +12,28 @@ import pygame
 T = typing.TypeVar("T")
 
 
-def load_images(path: str) -> typing.Generator[typing.Generator[pygame.Surface, None, None], None, None]:
-    """Load images from an directory"""
+def load_image(path: str) -> pygame.Surface:
+    """Load an image from a file"""
+    return pygame.image.load(path)
+
+
+def image_paths(path: str) -> typing.Generator[typing.List[str], None, None]:
+    """Paths of the images in each directory of a directory, in the order they are loaded by load_images"""
     for files in os.walk(path):
         files[1].sort()
         if files[2]:
-            yield (
-                pygame.image.load(os.path.join(files[0], file))
-                for file in sorted(files[2])
-            )
+            yield [os.path.join(files[0], file) for file in sorted(files[2])]
+
+
+def load_images(path: str) -> typing.Generator[typing.Generator[pygame.Surface, None, None], None, None]:
+    """Load images from an directory"""
+    for paths in image_paths(path):
+        yield (load_image(file) for file in paths)
 
 
-def chance(likelihood):
+def chance(likelihood, rng=random):
     """Have a chance of being True"""
-    return random.random() < likelihood
+    return rng.random() < likelihood
 
 
 def flatten(array: typing.Union[typing.Iterable[T], T]) -> typing.Generator[T, None, None]:
@@ -0,0 +1,366 @@
+"""Leaderboard of runs kept in an append-only log with a top-K index"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import random
+import bisect
+import struct
+import typing
+import argparse
+import threading
+
+# timestamp, pixels, host, sequence, name, then the CRC-32 of the fields before it
+RECORD = struct.Struct("<dqQQ16sI")
+FIELDS = struct.Struct("<dqQQ16s")
+
+# Longer names are cut off
+NAME_BYTES: int = 16
+
+INDEX_VERSION: int = 2
+
+# A run as (pixels, timestamp, name)
+Run = typing.Tuple[int, float, str]
+
+# A run with the leaderboard that recorded it and its place in the runs of that leaderboard, as (run, host, sequence)
+Entry = typing.Tuple[Run, int, int]
+
+
+def encode(entry: Entry) -> bytes:
+    """Returns an entry as a record of the log"""
+    (pixels, timestamp, name), host, sequence = entry
+    fields = FIELDS.pack(timestamp, pixels, host, sequence, name.encode("utf-8")[:NAME_BYTES])
+
+    return fields + struct.pack("<I", zlib.crc32(fields))
+
+
+def decode(record: bytes) -> typing.Optional[Entry]:
+    """Returns the entry of a record of the log, None if the record is corrupt"""
+    timestamp, pixels, host, sequence, name, crc = RECORD.unpack(record)
+
+    if zlib.crc32(record[:FIELDS.size]) != crc:
+        return None
+
+    return (pixels, timestamp, name.rstrip(b"\0").decode("utf-8", "replace")), host, sequence
+
+
+def day(timestamp: float) -> str:
+    """Returns the local day of a timestamp, like 2019-05-29"""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+class Day:
+    """A class representing the aggregates of the runs of a day"""
+
+    def __init__(self, runs: int = 0, pixels: int = 0, best: int = 0):
+        """Initializer for the Day class"""
+        self.runs: int = runs
+        self.pixels: int = pixels
+        self.best: int = best
+
+    def add(self, pixels: int) -> None:
+        """Count a run"""
+        self.runs += 1
+        self.pixels += pixels
+        self.best = max(self.best, pixels)
+
+    @property
+    def mean(self) -> float:
+        """Getter for the mean attribute of this Day, the mean pixels of a run"""
+        return self.pixels / self.runs if self.runs else 0.0
+
+    def to_dict(self) -> dict:
+        """Returns this Day as a dict that could be written as JSON"""
+        return {"runs": self.runs, "pixels": self.pixels, "best": self.best}
+
+
+class Leaderboard:
+    """A class representing leaderboards, every run recorded in an append-only log with the best K runs in an index"""
+
+    def __init__(self, directory: str, name: str = "leaderboard", k: int = 100, checkpoint_every: int = 64):
+        """
+        Initializer for the Leaderboard class
+        k: the amount of best runs kept, the most top can return
+        checkpoint_every: the amount of runs recorded between checkpoints of the index
+        """
+        self.directory: str = directory
+        self.name: str = name
+        self.k: int = k
+        self.checkpoint_every: int = checkpoint_every
+
+        # The best runs as (-pixels, timestamp, name), so they sort from the best and earlier runs win ties
+        self.__top: typing.List[typing.Tuple[int, float, str]] = []
+        self.days: typing.Dict[str, Day] = {}
+
+        # Records skipped as corrupt while reading the log
+        self.corrupt: int = 0
+
+        # The id of this leaderboard, made when its index is first written, and the highest sequence of every host
+        self.host: int = random.getrandbits(64)
+        self.sequences: typing.Dict[int, int] = {}
+
+        # Bytes of the log, including the records queued but not written yet
+        self.__size: int = 0
+        self.__unchecked: int = 0
+
+        self.__items: "queue.SimpleQueue[typing.Union[bytes, dict, None]]" = queue.SimpleQueue()
+        self.__thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> str:
+        """Getter for the path attribute of this Leaderboard, the log of every run"""
+        return os.path.join(self.directory, self.name + ".log")
+
+    @property
+    def index_path(self) -> str:
+        """Getter for the index_path attribute of this Leaderboard, the checkpoint of the best runs and days"""
+        return os.path.join(self.directory, self.name + ".index.json")
+
+    @property
+    def best(self) -> typing.Optional[Run]:
+        """Getter for the best attribute of this Leaderboard, the best run recorded, None if there is none"""
+        top = self.top(1)
+        return top[0] if top else None
+
+    def top(self, n: int = 10) -> typing.List[Run]:
+        """Returns the best n runs as (pixels, timestamp, name), at most k of them"""
+        return [(-pixels, timestamp, name) for pixels, timestamp, name in self.__top[:n]]
+
+    def start(self) -> None:
+        """Open the log, reading the records the index does not include, and start the writer thread"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.__open()
+
+        self.__thread = threading.Thread(target=self.__write_items, name="Leaderboard", daemon=True)
+        self.__thread.start()
+
+    def record(self, pixels: int, name: str = "", timestamp: typing.Optional[float] = None) -> None:
+        """Record a run, never blocks as the record is written by the writer thread"""
+        run = (pixels, time.time() if timestamp is None else timestamp, name)
+        self.__append((run, self.host, self.sequences.get(self.host, -1) + 1))
+
+        self.__unchecked += 1
+        if self.__unchecked >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Queue a checkpoint of the index, written once the records before it are on disk"""
+        self.__unchecked = 0
+        self.__items.put(self.__index())
+
+    def close(self) -> None:
+        """Write the queued records and a checkpoint, and stop the writer thread"""
+        if self.__thread is not None:
+            self.checkpoint()
+            self.__items.put(None)
+            self.__thread.join()
+            self.__thread = None
+
+    def merge(self, path: str) -> int:
+        """
+        Record every run in the log of another leaderboard that is not recorded yet, like one from another machine,
+        returns the amount
+        The index is only checkpointed once every run is merged
+        """
+        merged = 0
+
+        for entry in self.read(path):
+            if self.__append(entry):
+                merged += 1
+
+        self.checkpoint()
+
+        return merged
+
+    def read(self, path: str, offset: int = 0) -> typing.Iterator[Entry]:
+        """Yields every entry in a log from an offset, counting and skipping corrupt records"""
+        chunk_size = RECORD.size * 4096
+
+        with open(path, "rb") as file:
+            file.seek(offset)
+
+            while True:
+                chunk = file.read(chunk_size)
+                end = len(chunk) - len(chunk) % RECORD.size
+
+                for start in range(0, end, RECORD.size):
+                    entry = decode(chunk[start:start + RECORD.size])
+
+                    if entry is None:
+                        self.corrupt += 1
+                    else:
+                        yield entry
+
+                if len(chunk) < chunk_size:
+                    break
+
+    def __append(self, entry: Entry) -> bool:
+        """append method for this Leaderboard, returns False if the run was recorded already"""
+        if not self.__add(entry):
+            return False
+
+        self.__items.put(encode(entry))
+        self.__size += RECORD.size
+
+        return True
+
+    def __add(self, entry: Entry) -> bool:
+        """add method for this Leaderboard, returns False if the run was recorded already"""
+        run, host, sequence = entry
+
+        if sequence <= self.sequences.get(host, -1):
+            return False
+
+        self.sequences[host] = sequence
+
+        pixels, timestamp, name = run
+
+        self.days.setdefault(day(timestamp), Day()).add(pixels)
+
+        key = (-pixels, timestamp, name)
+        if len(self.__top) < self.k or key < self.__top[-1]:
+            bisect.insort(self.__top, key)
+            del self.__top[self.k:]
+
+        return True
+
+    def __index(self) -> dict:
+        """index method for this Leaderboard, returns the index as a dict that could be written as JSON"""
+        return {
+            "version": INDEX_VERSION,
+            "k": self.k,
+            "size": self.__size,
+            "host": self.host,
+            "sequences": {str(host): sequence for host, sequence in self.sequences.items()},
+            "top": [list(run) for run in self.top(self.k)],
+            "days": {key: value.to_dict() for key, value in self.days.items()}
+        }
+
+    def __load_index(self, size: int) -> int:
+        """load_index method for this Leaderboard, returns the size of the log the index includes"""
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return 0
+
+        # An index of another version, of fewer runs or of a log that is gone is rebuilt from the log
+        if index.get("version") != INDEX_VERSION or index.get("k", 0) < self.k or index.get("size", 0) > size:
+            return 0
+
+        for pixels, timestamp, name in index["top"][:self.k]:
+            self.__top.append((-pixels, timestamp, name))
+
+        self.days = {key: Day(**value) for key, value in index["days"].items()}
+
+        self.host = index["host"]
+        self.sequences = {int(host): sequence for host, sequence in index["sequences"].items()}
+
+        return index["size"]
+
+    def __open(self) -> None:
+        """open method for this Leaderboard"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+
+        # A record cut off by a crash is dropped, so the next ones line up
+        torn = size % RECORD.size
+        if torn:
+            with open(self.path, "r+b") as file:
+                file.truncate(size - torn)
+
+            size -= torn
+
+        offset = self.__load_index(size)
+
+        if offset < size:
+            for entry in self.read(self.path, offset):
+                self.__add(entry)
+
+        self.__size = size
+
+    def __write_index(self, index: dict) -> None:
+        """write_index method for this Leaderboard, replaces the index at once so a crash never leaves half of it"""
+        temporary = self.index_path + ".tmp"
+
+        with open(temporary, "w") as file:
+            json.dump(index, file, separators=(",", ":"))
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary, self.index_path)
+
+    def __write_items(self) -> None:
+        """write_items method for this Leaderboard, runs in the writer thread"""
+        with open(self.path, "ab") as log:
+            running = True
+
+            while running:
+                # Everything queued while the last batch was written is written together
+                batch = [self.__items.get()]
+
+                try:
+                    while True:
+                        batch.append(self.__items.get_nowait())
+                except queue.Empty:
+                    pass
+
+                records = []
+                index = None
+
+                for item in batch:
+                    if item is None:
+                        running = False
+                    elif isinstance(item, bytes):
+                        records.append(item)
+                    else:
+                        index = item
+
+                if records:
+                    log.write(b"".join(records))
+                    log.flush()
+                    os.fsync(log.fileno())
+
+                if index is not None:
+                    self.__write_index(index)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Show the best runs and the days of a leaderboard, merging the logs of other leaderboards into it first"""
+    parser = argparse.ArgumentParser(description="Jetpack Joyride leaderboard")
+    parser.add_argument("--directory", default="leaderboard")
+    parser.add_argument("--top", type=int, default=10, help="amount of the best runs to show")
+    parser.add_argument("--k", type=int, default=100, help="amount of the best runs to keep")
+    parser.add_argument("--days", action="store_true", help="show the aggregates of every day")
+    parser.add_argument("--merge", nargs="*", default=[], help="logs of other leaderboards to merge")
+    args = parser.parse_args(argv)
+
+    board = Leaderboard(args.directory, k=args.k)
+    board.start()
+
+    for path in args.merge:
+        print("Merged %d runs from %s" % (board.merge(path), path))
+
+    board.close()
+
+    for rank, (pixels, timestamp, name) in enumerate(board.top(args.top), 1):
+        print("%3d. %10d %s %s" % (rank, pixels, time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)), name))
+
+    if args.days:
+        for key, value in sorted(board.days.items()):
+            print("%s %8d runs, mean %10.1f, best %10d" % (key, value.runs, value.mean, value.best))
+
+    if board.corrupt:
+        print("%d corrupt records skipped" % board.corrupt, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,475 @@
+"""Asset loading"""
+
+import os
+import struct
+import typing
+import hashlib
+import weakref
+import concurrent.futures
+
+import pygame
+
+import atlas
+import helper
+import animation
+
+T = typing.TypeVar("T")
+
+Frames = typing.List[typing.Tuple[pygame.Surface, ...]]
+
+# The images and masks of each group of an asset
+Entry = typing.List[typing.List[typing.Tuple[pygame.Surface, pygame.mask.Mask]]]
+
+# Masks of every image, shared between sprites, images should not be changed after their mask is made
+MASKS: typing.MutableMapping[pygame.Surface, pygame.mask.Mask] = weakref.WeakKeyDictionary()
+
+
+def mask(surface: pygame.Surface) -> pygame.mask.Mask:
+    """Get the mask of a surface, making it if it has none"""
+    try:
+        return MASKS[surface]
+    except KeyError:
+        surface_mask = pygame.mask.from_surface(surface)
+        MASKS[surface] = surface_mask
+
+        return surface_mask
+
+
+def pack(frames: Frames) -> Frames:
+    """Pack the images of every group into an atlas, returns the images of each group as subsurfaces of its sheets"""
+    sources = [frame for group in frames for frame in group]
+    packed = atlas.Atlas.pack(sources)
+
+    # The masks of the images, like the ones a Loader read from its cache, are the masks of their packed frames
+    sheet_masks = None
+
+    for index, (source, frame) in enumerate(zip(sources, packed.frames)):
+        frame_mask = MASKS.get(source)
+
+        if frame_mask is None:
+            if sheet_masks is None:
+                sheet_masks = packed.masks()
+
+            frame_mask = sheet_masks[index]
+
+        MASKS[frame] = frame_mask
+
+    groups = []
+    index = 0
+
+    for group in frames:
+        groups.append(packed.frames[index:index + len(group)])
+        index += len(group)
+
+    return groups
+
+
+def rotations(image: pygame.Surface, steps: int, turn: float = 360) -> typing.Tuple[pygame.Surface, ...]:
+    """
+    Rotate an image to steps angles spread evenly over a turn in degrees, counterclockwise
+    The rotated images are packed into an atlas and their masks made now, so nothing is rotated while playing
+    """
+    frames = tuple(pygame.transform.rotozoom(image, index * turn / steps, 1) for index in range(steps))
+
+    return tuple(pack([frames])[0])
+
+
+class Asset(typing.Generic[T]):
+    """
+    A class representing assets, built from groups of images
+    The images are loaded ahead of time by a Loader, or when the asset is first used if it was not loaded yet
+    """
+
+    # Every asset made, in order
+    ASSETS: typing.List["Asset"] = []
+
+    def __init__(self, paths: typing.Sequence[typing.Sequence[str]], build: typing.Callable[[Frames], T],
+                 required: bool = True):
+        """
+        Initializer for the Asset class
+        paths: the paths of the images of each group
+        build: makes the asset from the loaded images of each group
+        required: if the game needs this Asset to start
+        """
+        self.paths: typing.List[typing.List[str]] = [list(group) for group in paths]
+        self.build: typing.Callable[[Frames], T] = build
+        self.required: bool = required
+
+        self.__loaded: bool = False
+        self.__value: typing.Optional[T] = None
+
+        self.ASSETS.append(self)
+
+    @classmethod
+    def directories(cls, path: str, required: bool = True) -> "Asset[typing.List[typing.List[pygame.Surface]]]":
+        """An asset of the images in each directory of a directory, like helper.load_images"""
+        return cls(list(helper.image_paths(path)), lambda frames: [list(images) for images in frames], required)
+
+    @classmethod
+    def directory(cls, path: str, required: bool = True,
+                  packed: bool = False) -> "Asset[typing.Tuple[pygame.Surface, ...]]":
+        """
+        An asset of the images in the first directory with images of a directory
+        packed: pack the images into an atlas if True
+        """
+        def build(frames: Frames) -> typing.Tuple[pygame.Surface, ...]:
+            if not frames:
+                return ()
+
+            return tuple((pack(frames) if packed else frames)[0])
+
+        return cls(list(helper.image_paths(path))[:1], build, required)
+
+    @classmethod
+    def animation(cls, path: str,
+                  loop_state: typing.Optional[animation.LoopState] = None,
+                  section_loopstates: typing.Optional[typing.List[animation.LoopState]] = None,
+                  required: bool = True, packed: bool = False) -> "Asset[animation.Animation]":
+        """
+        An asset of an animation directory, like animation.Animation.from_directory
+        packed: pack the frames of every section into an atlas if True
+        """
+        return cls(
+            animation.Animation.frame_paths(path),
+            lambda frames: animation.Animation.from_frames(pack(frames) if packed else frames,
+                                                           loop_state, section_loopstates),
+            required
+        )
+
+    @classmethod
+    def derived(cls, build: typing.Callable[[], T], required: bool = False) -> "Asset[T]":
+        """An asset without images, made from other assets when first used or once a Loader loaded them"""
+        return cls([], lambda frames: build(), required)
+
+    @property
+    def loaded(self) -> bool:
+        """Getter for the loaded attribute of this Asset"""
+        return self.__loaded
+
+    @property
+    def value(self) -> T:
+        """Getter for the value attribute of this Asset, loads it if it was not loaded yet"""
+        if not self.__loaded:
+            self.load()
+
+        return self.__value
+
+    @property
+    def name(self) -> str:
+        """Getter for the name attribute of this Asset, the directory of its images"""
+        paths = [path for group in self.paths for path in group]
+
+        if not paths:
+            return "derived"
+        if len(paths) == 1:
+            return os.path.dirname(paths[0])
+
+        return os.path.commonpath(paths)
+
+    def unload(self) -> None:
+        """Drop the value of this Asset, it is loaded again when it is next used"""
+        self.__value = None
+        self.__loaded = False
+
+    def load(self, frames: typing.Optional[Frames] = None) -> None:
+        """Build this Asset from loaded images, or load the images now if they are not given"""
+        if frames is None:
+            frames = [tuple(Loader.convert(helper.load_image(path)) for path in group) for group in self.paths]
+
+        self.__value = self.build(frames)
+        self.__loaded = True
+
+    def __get__(self, instance, owner) -> T:
+        """__get__ method for this Asset, so it could be used as a class attribute"""
+        return self.value
+
+
+class FrameCache:
+    """
+    A class representing frame caches, which keep the decoded images and masks of assets on disk
+    Entries are keyed by the paths, sizes and modification times of the image files and the pixel format, so changed
+    assets are decoded again
+    """
+
+    FORMAT: str = "RGBA"
+    VERSION: int = 1
+
+    MAGIC: bytes = b"JPFC"
+    HEADER = struct.Struct("<4sHI")
+    FRAME = struct.Struct("<III")
+
+    def __init__(self, path: str = os.path.join(".cache", "frames")):
+        """Initializer for the FrameCache class"""
+        self.path: str = path
+
+    def key(self, paths: typing.Sequence[typing.Sequence[str]]) -> str:
+        """Returns the key of the images of an asset"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(("%s:%d:%d" % (self.FORMAT, self.VERSION, len(paths))).encode())
+
+        for group in paths:
+            digest.update(struct.pack("<I", len(group)))
+
+            # Only the stats of the files, so a warm launch reads each asset once, from its entry
+            for path in group:
+                stat = os.stat(path)
+                digest.update(("%s:%d:%d" % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)).encode())
+
+        return digest.hexdigest()
+
+    def file(self, key: str) -> str:
+        """Returns the path of the file of a key"""
+        return os.path.join(self.path, key + ".frames")
+
+    def read(self, key: str) -> typing.Optional[Entry]:
+        """Read the images and masks of each group of an entry, returns None if there is no valid entry"""
+        try:
+            with open(self.file(key), "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        try:
+            magic, version, group_count = self.HEADER.unpack_from(data)
+            if magic != self.MAGIC or version != self.VERSION:
+                return None
+
+            offset = self.HEADER.size
+            groups = []
+
+            for _ in range(group_count):
+                frame_count, = struct.unpack_from("<I", data, offset)
+                offset += 4
+
+                group = []
+
+                for _ in range(frame_count):
+                    width, height, mask_size = self.FRAME.unpack_from(data, offset)
+                    offset += self.FRAME.size
+
+                    size = width * height * 4
+                    surface = pygame.image.frombuffer(data[offset:offset + size], (width, height), self.FORMAT)
+                    offset += size
+
+                    surface_mask = pygame.mask.Mask((width, height))
+                    mask_view = memoryview(surface_mask).cast("B")
+                    if len(mask_view) != mask_size:
+                        return None
+
+                    mask_view[:] = data[offset:offset + mask_size]
+                    offset += mask_size
+
+                    # Copy the surface, so it stops referencing the data that was read
+                    group.append((surface.copy(), surface_mask))
+
+                groups.append(group)
+
+        except (struct.error, ValueError):
+            return None
+
+        return groups
+
+    def write(self, key: str, frames: Entry):
+        """Write the images and masks of each group of an entry"""
+        chunks = [self.HEADER.pack(self.MAGIC, self.VERSION, len(frames))]
+
+        for group in frames:
+            chunks.append(struct.pack("<I", len(group)))
+
+            for surface, surface_mask in group:
+                mask_data = memoryview(surface_mask).cast("B").tobytes()
+                width, height = surface.get_size()
+
+                chunks.append(self.FRAME.pack(width, height, len(mask_data)))
+                chunks.append(pygame.image.tostring(surface, self.FORMAT))
+                chunks.append(mask_data)
+
+        os.makedirs(self.path, exist_ok=True)
+
+        # Write to a temporary file first, so a crash never leaves a broken entry
+        path = self.file(key)
+        temporary_path = "%s.%d.tmp" % (path, os.getpid())
+
+        with open(temporary_path, "wb") as file:
+            file.write(b"".join(chunks))
+
+        os.replace(temporary_path, path)
+
+    def load(self, paths: typing.Sequence[typing.Sequence[str]]):
+        """
+        Load the images and masks of an asset, from its entry if it has a valid one
+        Returns the key and the loaded groups, and if they were read from the cache
+        """
+        key = self.key(paths)
+        groups = self.read(key)
+
+        if groups is not None:
+            return key, groups, True
+
+        return key, [[(helper.load_image(path), None) for path in group] for group in paths], False
+
+
+class Loader:
+    """A class representing loaders, which decode the images of assets in worker threads"""
+
+    def __init__(self, assets: typing.Optional[typing.Iterable[Asset]] = None, workers: typing.Optional[int] = None,
+                 cache: typing.Optional[FrameCache] = None):
+        """
+        Initializer for the Loader class
+        assets: the assets to load, every asset made if None
+        workers: the amount of worker threads, chosen by concurrent.futures if None
+        cache: where decoded images are kept between launches, nowhere if None
+        """
+        if assets is None:
+            assets = Asset.ASSETS
+
+        self.assets: typing.List[Asset] = list(assets)
+        self.workers: typing.Optional[int] = workers
+        self.cache: typing.Optional[FrameCache] = cache
+
+        self.__executor: typing.Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.__pending: typing.Dict[Asset, concurrent.futures.Future] = {}
+
+        # Assets made from other assets that are built once every asset with images is loaded
+        self.__derived: typing.List[Asset] = []
+
+        self.__total: int = 0
+        self.__done: int = 0
+
+    @property
+    def progress(self) -> float:
+        """Getter for the progress attribute of this Loader, between 0 and 1"""
+        if not self.__total:
+            return 1.0
+
+        return self.__done / self.__total
+
+    @property
+    def ready(self) -> bool:
+        """Getter for the ready attribute of this Loader, True once every required asset is loaded"""
+        return all(asset.loaded for asset in self.assets if asset.required)
+
+    @property
+    def finished(self) -> bool:
+        """Getter for the finished attribute of this Loader, True once every asset is loaded"""
+        return not self.__pending and not self.__derived
+
+    def __load(self, paths: typing.List[typing.List[str]]):
+        """load method for this Loader, runs in a worker thread"""
+        if self.cache is not None:
+            return self.cache.load(paths)
+
+        return None, [[(helper.load_image(path), None) for path in group] for group in paths], False
+
+    def start(self) -> None:
+        """Start decoding the images of every asset that is not loaded yet"""
+        self.__executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+
+        # Every asset is loaded by one job, so a cached asset is one read
+        for asset in self.assets:
+            if not asset.loaded and asset.paths:
+                self.__pending[asset] = self.__executor.submit(self.__load, asset.paths)
+                self.__total += sum(map(len, asset.paths))
+
+        self.__derived = [asset for asset in self.assets if not asset.loaded and not asset.paths]
+
+    def poll(self) -> None:
+        """Build every asset whose images finished loading, must be called from the main thread"""
+        # If every image was loaded before this poll, so the game may have started
+        started = not self.__pending
+
+        for asset, future in list(self.__pending.items()):
+            if not future.done():
+                continue
+
+            del self.__pending[asset]
+            self.__done += sum(map(len, asset.paths))
+
+            # The asset might have been loaded on the main thread while waiting
+            if asset.loaded:
+                continue
+
+            key, groups, cached = future.result()
+            frames = []
+
+            for group in groups:
+                surfaces = []
+
+                for surface, surface_mask in group:
+                    converted = self.convert(surface)
+
+                    if surface_mask is None:
+                        surface_mask = mask(converted)
+                    else:
+                        MASKS[converted] = surface_mask
+
+                    surfaces.append(converted)
+
+                frames.append(tuple(surfaces))
+
+            asset.load(frames)
+
+            if self.cache is not None and not cached:
+                entry = [
+                    [(surface, MASKS[converted]) for (surface, _), converted in zip(group, surfaces)]
+                    for group, surfaces in zip(groups, frames)
+                ]
+                self.__executor.submit(self.cache.write, key, entry)
+
+        # Required assets made from other assets are built once every asset with images is loaded
+        if not self.__pending:
+            for asset in [asset for asset in self.__derived if asset.required]:
+                self.__derived.remove(asset)
+
+                if not asset.loaded:
+                    asset.load()
+
+            # The others are built one a poll in later polls, so the game starts without waiting for them
+            if started and self.__derived:
+                asset = self.__derived.pop(0)
+
+                if not asset.loaded:
+                    asset.load()
+
+        if not self.__pending and self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+
+    def wait(self) -> None:
+        """Block until every asset is loaded"""
+        concurrent.futures.wait(list(self.__pending.values()))
+
+        self.poll()
+
+        for asset in self.__derived:
+            if not asset.loaded:
+                asset.load()
+
+        self.__derived.clear()
+
+    def shutdown(self) -> None:
+        """Stop loading, assets that were not loaded yet load when they are first used"""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+        self.__pending.clear()
+        self.__derived.clear()
+
+    @staticmethod
+    def convert(surface: pygame.Surface) -> pygame.Surface:
+        """Convert a surface to the pixel format of the display, if there is one"""
+        if pygame.display.get_surface() is None:
+            return surface
+
+        return surface.convert_alpha()
+
+
+def load_all() -> None:
+    """
+    Load every asset now, blocking until they are all loaded
+    For headless runs that time frames, so nothing is loaded or made inside the first ones
+    """
+    loader = Loader()
+    loader.start()
+    loader.wait()
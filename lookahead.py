@@ -0,0 +1,341 @@
+"""Collision lookahead, how many steps until a player hits a zapper for sequences of actions"""
+
+import copy
+import typing
+
+import numpy
+import pygame
+
+import env
+import loading
+import animation
+import world
+import sprites
+
+# Returned for sequences of actions the player survives
+NO_HIT: int = -1
+
+
+def round_position(values: numpy.ndarray) -> numpy.ndarray:
+    """Returns positions rounded like pygame.Rect rounds them, half away from zero"""
+    return (numpy.sign(values) * numpy.floor(numpy.abs(values) + 0.5)).astype(numpy.int64)
+
+
+def hull(player: sprites.Player) -> pygame.mask.Mask:
+    """Returns the mask of every pixel any frame of the animation of a player covers"""
+    frames = [frame for section in player.animation.sections for frame in section.frames]
+
+    width = max(frame.get_width() for frame in frames)
+    height = max(frame.get_height() for frame in frames)
+
+    result = pygame.mask.Mask((width, height))
+    for frame in frames:
+        result.draw(pygame.mask.from_surface(frame), (0, 0))
+
+    return result
+
+
+def next_section(sprite: sprites.AnimatedSprite,
+                 animation_iter: animation.LoopableIter) -> typing.Optional[animation.LoopableIter]:
+    """Returns the iterator of the next section like AnimatedSprite.next_section, None once the animation finished"""
+    try:
+        loop_state = sprite.section_loop_states[animation_iter.current_item]
+    except IndexError:
+        loop_state = None
+
+    try:
+        return animation.LoopableIter(next(animation_iter), copy.deepcopy(loop_state))
+    except StopIteration:
+        return None
+
+
+def timeline(sprite: sprites.AnimatedSprite, animation_iter: animation.LoopableIter,
+             section_iter: typing.Optional[animation.LoopableIter], frames_passed: int, updates: int,
+             ids: typing.Dict[pygame.Surface, int]) -> numpy.ndarray:
+    """
+    Returns the id of the frame an animated sprite shows after every amount of updates up to updates, like
+    AnimatedSprite.update from the state of its iterators, -1 while it still shows the frame it showed before
+    """
+    result = numpy.full(updates + 1, -1, numpy.int64)
+    frame = -1
+
+    for update in range(1, updates + 1):
+        if section_iter is not None:
+            if frames_passed >= sprite.speed:
+                try:
+                    frame = ids[next(section_iter)]
+                except StopIteration:
+                    section_iter = next_section(sprite, animation_iter)
+
+                frames_passed = 0
+            else:
+                frames_passed += 1
+
+        result[update] = frame
+
+    return result
+
+
+class Track:
+    """A class representing tracks, the rect and mask of a zapper at every step of a lookahead"""
+
+    def __init__(self, zapper: sprites.Zapper, speeds: typing.Sequence[int]):
+        """
+        Initializer for the Track class
+        speeds: the pixels the world scrolls at every step, which zappers move left by
+        """
+        self.rects: typing.List[pygame.Rect] = []
+        self.masks: typing.List[pygame.mask.Mask] = []
+
+        rect = zapper.rect.copy()
+        image = zapper.image
+        angle = zapper.angle
+        index = -1 if angle is None else round(angle * zapper.ANGLE_STEPS / 180) % zapper.ANGLE_STEPS
+
+        for dx in speeds:
+            self.rects.append(rect)
+            self.masks.append(loading.mask(image))
+
+            # Same as Zapper.update, rotating around the center whenever the angle step changes
+            rect = rect.move(-dx, zapper.dy)
+
+            if zapper.spin and angle is not None:
+                angle = (angle + zapper.spin) % 180
+                new_index = round(angle * zapper.ANGLE_STEPS / 180) % zapper.ANGLE_STEPS
+
+                if new_index != index:
+                    index = new_index
+                    image = zapper.ROTATIONS[int(zapper.orientation)][index]
+
+                    center = rect.center
+                    rect = pygame.Rect(rect.topleft, image.get_size())
+                    rect.center = center
+
+
+class Lookahead:
+    """A class representing lookaheads, which predict when a player hits a zapper for many sequences of actions at once"""
+
+    def __init__(self, game_world: world.World, player: sprites.Player, conservative: bool = False):
+        """
+        Initializer for the Lookahead class
+        conservative: test every frame of the player with the union of the frames of its animation, so a hit is never
+        predicted late, but can be predicted early for a frame the player would have squeezed past
+        """
+        self.world: world.World = game_world
+        self.player: sprites.Player = player
+        self.conservative: bool = conservative
+
+        self.hull: pygame.mask.Mask = hull(player)
+
+        # Every frame of the animation of the player by id, the image of the player is the last id if it is not one
+        self.frames: typing.List[pygame.Surface] = [
+            frame for section in player.animation.sections for frame in section.frames
+        ]
+        self.__ids: typing.Dict[pygame.Surface, int] = {frame: index for index, frame in enumerate(self.frames)}
+
+        self.__masks: typing.List[pygame.mask.Mask] = []
+        self.__tracks: typing.List[Track] = []
+        self.__hits: typing.Dict[typing.Tuple[int, int, int, int], bool] = {}
+
+    def speeds(self, steps: int) -> typing.List[int]:
+        """Returns the pixels the world scrolls at every step, like World.apply_tier"""
+        game_world = self.world
+
+        if game_world.curve is None or game_world.over:
+            return [game_world.dx] * steps
+
+        speeds = []
+        pixels = game_world.pixels
+
+        for _ in range(steps):
+            dx = game_world.curve.tier(pixels).speed
+
+            speeds.append(dx)
+            pixels += dx
+
+        return speeds
+
+    def tracks(self, steps: int) -> typing.List[Track]:
+        """Returns the tracks of every zapper over steps, worked out again on every call"""
+        speeds = self.speeds(steps)
+
+        self.__tracks = [Track(zapper, speeds) for zapper in self.world.zappers]
+        self.__hits.clear()
+
+        return self.__tracks
+
+    def timelines(self, steps: int) -> numpy.ndarray:
+        """
+        Returns the timelines of the animation of the player over steps, by where it starts
+        Row 0 goes on from where the animation is, and row 1 + section restarts it at a section
+        """
+        player = self.player
+        cursor = player.cursor
+
+        animation_iter = animation.LoopableIter(player.animation)
+        animation_iter.state = cursor[2:6]
+
+        section_iter = None
+        if not cursor[0] and cursor[6] >= 0:
+            section_iter = animation.LoopableIter(player.animation.sections[cursor[6]])
+            section_iter.state = cursor[7:11]
+
+        rows = [timeline(player, animation_iter, section_iter, cursor[1], steps, self.__ids)]
+
+        # Like AnimatedSprite.restart
+        for section in range(len(player.animation.sections)):
+            animation_iter = animation.LoopableIter(player.animation, copy.deepcopy(player.animation_loop_state),
+                                                    section)
+            rows.append(timeline(player, animation_iter, next_section(player, animation_iter), 0, steps, self.__ids))
+
+        return numpy.array(rows)
+
+    def predict(self, actions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Returns the amount of steps until the player is dead for every sequence of actions, NO_HIT if it survives them
+        actions: env.FLY or env.FALL for every sequence and step, shaped (sequences, steps), the action of a step is
+        taken before it like Agent.act
+        """
+        actions = numpy.asarray(actions, dtype=bool)
+        if actions.ndim == 1:
+            actions = actions[numpy.newaxis]
+
+        count, steps = actions.shape
+        player = self.player
+
+        result = numpy.full(count, NO_HIT, numpy.int64)
+
+        if player.dead:
+            result[:] = 0
+            return result
+
+        tracks = self.tracks(steps)
+
+        # The frames and the image of the player by id
+        images = self.frames + [player.image]
+
+        if self.conservative:
+            self.__masks = [self.hull] * len(images)
+        else:
+            self.__masks = [loading.mask(image) for image in images]
+
+        widths = numpy.array([image.get_width() for image in images])
+        heights = numpy.array([image.get_height() for image in images])
+
+        timelines = self.timelines(steps)
+
+        # Player state for every sequence
+        x = player.rect.x
+        screen_bottom = player.screen_bottom
+
+        exact_y = numpy.full(count, player.exact_position[1])
+        rect_y = numpy.full(count, player.rect.y, numpy.int64)
+        dy = numpy.full(count, float(player.dy))
+        ddy = numpy.full(count, float(player.ddy))
+        flying_input = numpy.full(count, player.input)
+
+        was_bottom = numpy.full(count, player.edges[0])
+        was_top = numpy.full(count, player.edges[1])
+
+        alive = numpy.ones(count, bool)
+
+        # The animation of every sequence, the row of its timeline, the updates since it started on that row and the
+        # frame shown when it started
+        start = numpy.zeros(count, numpy.int64)
+        age = numpy.zeros(count, numpy.int64)
+        carried = numpy.full(count, self.__ids.get(player.image, len(self.frames)))
+
+        frame = carried
+
+        for step in range(steps):
+            # Agent.act, which only changes the flying state on a new input, restarting the animation
+            action = actions[:, step]
+            changed = action != flying_input
+
+            flying_input = action
+            ddy = numpy.where(changed, numpy.where(action, player.FLY_ACCELERATION, player.FALL_ACCELERATION), ddy)
+
+            section = numpy.where(action, sprites.PlayerAnimationState.TAKING_OFF, sprites.PlayerAnimationState.FALLING)
+            carried = numpy.where(changed, frame, carried)
+            start = numpy.where(changed, 1 + section, start)
+            age = numpy.where(changed, 0, age)
+
+            # World.collide, before the sprites update
+            width = widths[frame]
+            height = heights[frame]
+
+            for index, track in enumerate(tracks):
+                zapper_rect = track.rects[step]
+
+                touching = (alive & (x < zapper_rect.right) & (x + width > zapper_rect.left) &
+                            (rect_y < zapper_rect.bottom) & (rect_y + height > zapper_rect.top))
+
+                for candidate in numpy.flatnonzero(touching):
+                    if self.__hit(index, step, x, int(rect_y[candidate]), int(frame[candidate])):
+                        alive[candidate] = False
+                        result[candidate] = step + 1
+
+            if not alive.any():
+                break
+
+            # MovingSprite.update then AcceleratingSprite.update
+            exact_y = exact_y + dy
+            rect_y = round_position(exact_y)
+            dy = dy + ddy
+
+            # ScreenSprite.update, Player.on_hit_bottom restarts the running animation unless flying
+            at_bottom = rect_y + height >= screen_bottom
+            at_top = rect_y <= 0
+
+            hit_bottom = at_bottom & ~was_bottom
+            dy = numpy.where(hit_bottom | (at_top & ~was_top), 0.0, dy)
+
+            running = hit_bottom & (ddy >= 0)
+            carried = numpy.where(running, frame, carried)
+            start = numpy.where(running, 1 + sprites.PlayerAnimationState.RUNNING, start)
+            age = numpy.where(running, 0, age)
+
+            was_bottom = at_bottom
+            was_top = at_top
+
+            # InScreenSprite.update, the exact position is taken from the rect the next update if it was clamped
+            projected = rect_y
+            rect_y = numpy.where(at_top, 0, rect_y)
+            rect_y = numpy.where(rect_y + height >= screen_bottom, screen_bottom - height, rect_y)
+
+            exact_y = numpy.where(rect_y != projected, rect_y, exact_y)
+
+            # AnimatedSprite.update, the image changes keeping the position
+            age = age + 1
+            shown = timelines[start, age]
+            frame = numpy.where(shown >= 0, shown, carried)
+            height = heights[frame]
+
+            # Player.update
+            stop = ((rect_y <= 0) & (ddy < 0)) | ((rect_y + height >= screen_bottom) & (ddy > 0))
+            dy = numpy.where(stop, 0.0, dy)
+            ddy = numpy.where(stop, 0.0, ddy)
+
+        return result
+
+    def hints(self, steps: int = 60) -> typing.Dict[int, int]:
+        """Returns the amount of steps until the player is dead when holding each action, NO_HIT if it survives"""
+        actions = numpy.array([[env.FLY] * steps, [env.FALL] * steps])
+        fly, fall = self.predict(actions)
+
+        return {env.FLY: int(fly), env.FALL: int(fall)}
+
+    def __hit(self, index: int, step: int, x: int, y: int, frame: int) -> bool:
+        """hit method for this Lookahead, the precise test of a frame of the player at a position, kept for every sequence"""
+        key = (index, step, y, frame)
+
+        try:
+            return self.__hits[key]
+        except KeyError:
+            track = self.__tracks[index]
+            zapper_rect = track.rects[step]
+
+            hit = self.__masks[frame].overlap(track.masks[step], (zapper_rect.x - x, zapper_rect.y - y)) is not None
+            self.__hits[key] = hit
+
+            return hit
@@ -4,79 +4,134 @@
 """
 
 import os
-import random
+import sys
+import time
+import typing
+import argparse
 
 import pygame
 
 import helper
+import controls
+import render
+import capture
+import telemetry
+import resources
+import spectate
+import world
+import loading
+import pacing
+import leaderboard
+import difficulty
 import sprites
 
 # I - Initialization
 pygame.init()
 
 
-def main():
+def main(argv: typing.Optional[typing.List[str]] = None):
     """This function defines the mainline logic for this program"""
+    parser = argparse.ArgumentParser(description="Jetpack Joyride")
+    parser.add_argument("--video", help="file to record the screen to")
+    parser.add_argument("--raw", action="store_true", help="record raw frames instead of compressed frames")
+    parser.add_argument("--telemetry", default="telemetry", help="directory to write telemetry to")
+    parser.add_argument("--leaderboard", default="leaderboard", help="directory to keep the leaderboard in")
+    parser.add_argument("--vsync", action="store_true", help="let flipping the display wait for the screen")
+    parser.add_argument("--power-saving", action="store_true", help="skip frames while nothing on the screen changes")
+    parser.add_argument("--spectate", type=int, help="port to stream the game to spectators on")
+    parser.add_argument("--memory-budget", type=float, help="MiB of surfaces, masks, sounds and sprites to stay under")
+    args = parser.parse_args(argv)
 
     # D - Display
-    screen: pygame.Surface = pygame.display.set_mode((1000, 480))
+    screen: pygame.Surface = pygame.display.set_mode((1000, 480), pygame.SCALED if args.vsync else 0,
+                                                     vsync=int(args.vsync))
     pygame.display.set_caption("Jetpack Joyride")
 
+    clock = pygame.time.Clock()
+
+    # Loading Screen
+    loader = loading.Loader(cache=loading.FrameCache())
+    loader.start()
+
+    loading_text = sprites.TextSprite(
+        position=(0, 0),
+        font=helper.default_font(32),
+        text="",
+        color=pygame.Color(255, 255, 255, 255),
+        antialias=True
+    )
+
+    while not loader.ready:
+        clock.tick(60)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                loader.shutdown()
+                pygame.quit()
+                return
+
+        loader.poll()
+
+        loading_text.text = "Loading... %d%%" % round(loader.progress * 100)
+        loading_text.horizontally_center(0, screen.get_size()[0])
+        loading_text.vertically_center(0, screen.get_size()[1])
+
+        screen.fill((0, 0, 0))
+        screen.blit(loading_text.image, loading_text.rect)
+
+        pygame.display.flip()
+
     # E - Entities
 
     # Music
     pygame.mixer.music.load(os.path.join("assets", "audio", "music.wav"))
     pygame.mixer.music.play(-1)
 
-    # Speed
-    dx = 8
+    game_world = world.World(screen, curve=difficulty.Difficulty())
 
-    # Background
+    # Players
+    player = game_world.spawn_player()
 
-    backgrounds = pygame.sprite.Group(
-        sprites.BackgroundSprite(screen=screen, images=list(images), velocity=(0, 0))
-        for images in helper.load_images(os.path.join("assets", "background"))
-    )
+    renderer = render.Renderer()
 
-    # Players
-    player = sprites.Player(screen=screen, position=(round(screen.get_size()[0] * (1 / 8)), 0))
-    player.flying = False
+    # Video
+    recorder: typing.Optional[capture.Recorder] = None
+    if args.video is not None:
+        recorder = capture.Recorder(args.video, screen.get_size(), compress=not args.raw)
+        recorder.start()
 
-    players = pygame.sprite.Group(player)
+    # Telemetry
+    metrics = telemetry.Telemetry(telemetry.Writer(args.telemetry))
+    metrics.start()
 
-    # Zappers
-    zapper_spacings = (300, 500)
-    zappers = pygame.sprite.Group()
+    # Memory
+    budget: typing.Optional[resources.Budget] = None
+    if args.memory_budget is not None:
+        budget = resources.Budget(total=round(args.memory_budget * 1024 * 1024))
 
-    # Scoreboards
-    scoreboard = sprites.Scoreboard()
-    scoreboards = pygame.sprite.Group(scoreboard)
+    # Leaderboard
+    board = leaderboard.Leaderboard(args.leaderboard)
+    board.start()
 
-    # Game Over
-    game_over = sprites.TextSprite(
-        position=(0, 0),
-        font=helper.default_font(48, bold=True),
-        text="GAME OVER!",
-        color=pygame.Color(255, 255, 255, 255),
-        antialias=True
-    )
+    # Spectators
+    spectator: typing.Optional[spectate.Server] = None
+    if args.spectate is not None:
+        spectator = spectate.Server(port=args.spectate)
+        spectator.start()
 
-    game_over.horizontally_center(0, screen.get_size()[0])
-    game_over.vertically_center(0, screen.get_size()[1])
+        # The port is chosen by the OS if it was 0
+        print("Spectators can watch on port %d" % spectator.port)
 
-    # Groups
-    background_sprites = [backgrounds, zappers]
-    foreground_sprites = [players, scoreboards]
+    # Input
+    player_controls = controls.Controls()
+    player_controls.allow()
 
-    all_sprites = [background_sprites, foreground_sprites]
-    game_sprites = pygame.sprite.LayeredUpdates(all_sprites)
+    pacer = pacing.Pacer(vsync=args.vsync, power_saving=args.power_saving)
 
     # A - Assign Variables
-    next_zapper_spacing = random.randint(*zapper_spacings)
-    zapper_distance = 0
-
-    clock = pygame.time.Clock()
     keep_going = True
+    recorded = False
+    drawn = True
 
     # Hide the mouse pointer
     pygame.mouse.set_visible(False)
@@ -84,72 +139,71 @@ def main():
     while keep_going:
 
         # T - Time
-        clock.tick(60)
+        pacer.wait(player_controls.sleep, idle=not drawn, flipped=drawn)
+        clock.tick()
+        frame_start = time.perf_counter()
 
-        # E - Event Handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                keep_going = False
+        # Assets that are not required keep loading while playing
+        loader.poll()
 
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    player.flying = True
-            if event.type == pygame.KEYUP:
-                if event.key == pygame.K_SPACE:
-                    player.flying = False
+        # E - Event Handling, as late as possible before the world steps
+        keep_going = player_controls.latch(player)
 
-        # Update speed of background sprites
-        for group in background_sprites:
-            for sprite in group:
-                if isinstance(sprite, sprites.MovingSprite):
-                    sprite.dx = -dx
+        game_world.step()
 
-        background_speed = -dx
+        if spectator is not None:
+            spectator.publish(game_world)
 
-        # Update speed of backgrounds
-        for sprite in reversed(list(backgrounds)):
-            background_speed *= (3 / 4)
-            sprite.dx = round(background_speed)
+        # Checking the budget walks every sprite, so it is only done every few seconds
+        if budget is not None and game_world.ticks % 300 == 0:
+            memory_report = budget.enforce(game_world)
 
-        # Spawn Zapper
-        if zapper_distance > next_zapper_spacing:
-            zapper_distance = 0
+            if memory_report is not None:
+                metrics.memory(memory_report)
 
-            zappers.add(sprites.Zapper.random_spawn(screen=screen, velocity=(-dx, 0), ))
+        # Check if all players are dead
+        if game_world.over:
+            pygame.mixer.music.stop()
 
-            next_zapper_spacing = random.randint(*zapper_spacings)
+            # Record the run once, and show the best one under game over
+            if not recorded:
+                recorded = True
 
-        zapper_distance += dx
+                scoreboard = game_world.scoreboards[player]
+                board.record(scoreboard.pixels)
 
-        # Add new sprites
-        game_sprites.add(all_sprites)
+                game_world.game_over.text = "GAME OVER! Best: %d" % round(board.best[0] / scoreboard.unit)
+                game_world.game_over.horizontally_center(0, screen.get_size()[0])
 
-        # Check collisions
-        # Optimize precise collisions by only checking them if rect collides
-        for player, collided_zappers in pygame.sprite.groupcollide(players, zappers, False, False).items():
-            for zapper in collided_zappers:
-                if pygame.sprite.collide_mask(player, zapper):
-                    if not player.dead:
-                        player.dead = True
+        # R - Refresh Screen, only once something changed after game over if power saving
+        exhaust = (game_world.exhaust,) if game_world.exhaust else ()
+        drawn = renderer.draw(screen, game_world.game_sprites, exhaust,
+                              changed_only=pacer.power_saving and game_world.over)
 
-        # Check if all players are dead
-        if all(map(lambda x: x.dead, players)):
-            dx = 0
-            pygame.mixer.music.stop()
-            game_sprites.add(game_over)
+        if recorder is not None:
+            recorder.write(screen)
 
-        # Update Scoreboard
-        scoreboard.pixels += dx
+        if drawn:
+            pygame.display.flip()
 
-        # R - Refresh Screen
-        game_sprites.update()
-        game_sprites.draw(screen)
+            metrics.frame(clock.get_time(), game_world, player_controls.presented())
 
-        pygame.display.flip()
+        # Emit less exhaust while the work of a frame does not fit in it
+        game_world.exhaust.adapt(time.perf_counter() - frame_start)
+
+    loader.shutdown()
+    metrics.close(game_world)
+    board.close()
+
+    if spectator is not None:
+        spectator.close()
+
+    if recorder is not None:
+        recorder.close()
 
     pygame.mouse.set_visible(True)
     pygame.quit()
 
 
 if __name__ == '__main__':
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,164 @@
+"""Frame pacing with jitter statistics"""
+
+import sys
+import time
+import typing
+import argparse
+import statistics
+import collections
+
+import pygame
+
+
+class Pacer:
+    """A class representing frame pacers, which sleep and then busy-wait until each frame is due"""
+
+    def __init__(self, frame_rate: int = 60, spin: float = 0.002, window: int = 120, vsync: bool = False,
+                 power_saving: bool = False, idle_frames: int = 6):
+        """
+        Initializer for the Pacer class
+        spin: the seconds before a deadline that are busy-waited instead of slept
+        window: the amount of frames the rolling statistics are of
+        vsync: if flipping the display waits for the screen, so the pacer only times frames, turned off if the
+        frames come faster than the screen refreshes
+        power_saving: if idle waits wait idle_frames frames
+        """
+        self.frame_rate: int = frame_rate
+        self.period: int = round(1e9 / frame_rate)
+        self.spin: int = round(spin * 1e9)
+        self.vsync: bool = vsync
+        self.power_saving: bool = power_saving
+        self.idle_frames: int = idle_frames
+
+        # Nanoseconds between the starts of frames, and from deadlines to the starts of frames
+        self.intervals: typing.Deque[int] = collections.deque(maxlen=window)
+        self.lateness: typing.Deque[int] = collections.deque(maxlen=window)
+
+        self.frames: int = 0
+        self.missed: int = 0
+        self.skipped: int = 0
+
+        self.__deadline: typing.Optional[int] = None
+        self.__started: typing.Optional[int] = None
+
+    @property
+    def interval(self) -> float:
+        """Getter for the interval attribute of this Pacer, the seconds between the starts of the last two frames"""
+        return self.intervals[-1] / 1e9 if self.intervals else 0.0
+
+    @property
+    def jitter(self) -> float:
+        """Getter for the jitter attribute of this Pacer, the standard deviation in seconds of the rolling intervals"""
+        return statistics.pstdev(self.intervals) / 1e9 if len(self.intervals) > 1 else 0.0
+
+    def wait(self, sleep: typing.Callable[[float], None] = time.sleep, idle: bool = False,
+             flipped: bool = True) -> None:
+        """
+        Wait until the next frame is due
+        sleep: sleeps for at most some seconds, like Controls.sleep to keep the time input arrives while waiting
+        idle: if the world is static, so power saving waits several frames
+        flipped: if the last frame was flipped, as only then did vsync wait for the screen
+        """
+        now = time.perf_counter_ns()
+
+        if self.__deadline is None:
+            self.__deadline = now
+
+        frames = self.idle_frames if idle and self.power_saving else 1
+        deadline = self.__deadline + self.period * frames
+
+        # Flipping did not wait for the screen if it came back in under half a refresh, so pace by sleeping instead
+        if self.vsync and flipped and self.__started is not None and (now - self.__started) * 2 < self.period:
+            self.vsync = False
+
+        if self.vsync and flipped:
+            # Flipping waited for the screen, so a frame is missed if it took longer than a refresh and a half
+            started = now
+            if self.__started is not None and (started - self.__started) * 2 > self.period * 3:
+                self.missed += 1
+
+            deadline = started
+
+        elif now > deadline:
+            # Frames that ran late start now instead of trying to catch up
+            self.missed += 1
+            deadline = started = now
+
+        else:
+            while deadline - now > self.spin:
+                sleep((deadline - now - self.spin) / 1e9)
+                now = time.perf_counter_ns()
+
+            while now < deadline:
+                now = time.perf_counter_ns()
+
+            started = now
+
+        if self.__started is not None:
+            self.intervals.append(started - self.__started)
+        self.lateness.append(started - deadline)
+
+        self.__deadline = deadline
+        self.__started = started
+
+        self.frames += 1
+        self.skipped += frames - 1
+
+    def stats(self) -> dict:
+        """Returns the counters and rolling statistics of this Pacer in milliseconds, as a dict"""
+        return {
+            "frames": self.frames,
+            "missed": self.missed,
+            "skipped": self.skipped,
+            "mean_interval": statistics.fmean(self.intervals) / 1e6 if self.intervals else 0.0,
+            "jitter": self.jitter * 1000,
+            "max_lateness": max(self.lateness, default=0) / 1e6
+        }
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Compare the frame intervals of Pacer to pygame.time.Clock.tick while doing some work every frame"""
+    parser = argparse.ArgumentParser(description="Frame pacing comparison")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--frame-rate", type=int, default=60)
+    parser.add_argument("--work", type=float, default=5.0, help="milliseconds of work every frame")
+    args = parser.parse_args(argv)
+
+    def work():
+        end = time.perf_counter() + args.work / 1000
+        while time.perf_counter() < end:
+            pass
+
+    clock = pygame.time.Clock()
+    intervals = collections.deque(maxlen=args.frames)
+
+    last = time.perf_counter_ns()
+    for _ in range(args.frames):
+        clock.tick(args.frame_rate)
+
+        now = time.perf_counter_ns()
+        intervals.append(now - last)
+        last = now
+
+        work()
+
+    pacer = Pacer(args.frame_rate, window=args.frames)
+    for _ in range(args.frames):
+        pacer.wait()
+        work()
+
+    intervals.popleft()
+    print("Clock.tick: mean interval %.3f ms, jitter %.3f ms" % (
+        statistics.fmean(intervals) / 1e6, statistics.pstdev(intervals) / 1e6
+    ))
+
+    stats = pacer.stats()
+    print("Pacer:      mean interval %.3f ms, jitter %.3f ms, missed %d, max lateness %.3f ms" % (
+        stats["mean_interval"], stats["jitter"], stats["missed"], stats["max_lateness"]
+    ))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,162 @@
+"""Particle systems"""
+
+import typing
+
+import numpy
+import pygame
+
+
+class Particles:
+    """
+    A class representing particle systems, like jetpack exhaust
+    The state of every particle is kept in preallocated arrays used as a ring buffer, so emitting over capacity
+    replaces the oldest particles, and particles are drawn from a few images faded ahead of time
+    """
+
+    CAPACITY: int = 4096
+    FADES: int = 16
+
+    def __init__(self, capacity: int = CAPACITY, lifetime: typing.Tuple[int, int] = (20, 35),
+                 gravity: float = 0.15, radius: int = 4, colors: typing.Sequence[pygame.Color] = (
+                     pygame.Color(255, 220, 120), pygame.Color(255, 120, 40), pygame.Color(90, 90, 90)
+                 ), layer: int = -1, seed: typing.Optional[int] = None):
+        """
+        Initializer for the Particles class
+        lifetime: the range of the frames a particle lives for
+        gravity: the pixels per frame added to the vertical speed of every particle each frame
+        colors: the colors a particle fades through, from when it is emitted until it dies
+        layer: particles are drawn after the sprites of this layer
+        """
+        self.capacity: int = capacity
+        self.lifetime: typing.Tuple[int, int] = lifetime
+        self.gravity: float = gravity
+        self.layer: int = layer
+
+        self.random: numpy.random.Generator = numpy.random.default_rng(seed)
+
+        # Particle state, one element per particle
+        self.x: numpy.ndarray = numpy.zeros(capacity, numpy.float32)
+        self.y: numpy.ndarray = numpy.zeros(capacity, numpy.float32)
+        self.dx: numpy.ndarray = numpy.zeros(capacity, numpy.float32)
+        self.dy: numpy.ndarray = numpy.zeros(capacity, numpy.float32)
+        self.age: numpy.ndarray = numpy.zeros(capacity, numpy.float32)
+        self.life: numpy.ndarray = numpy.zeros(capacity, numpy.float32)
+
+        self.__next: int = 0
+
+        # Fraction of the emission rate, lowered while frames go over budget
+        self.emission: float = 1.0
+        self.__owed: float = 0.0
+
+        self.images: typing.List[pygame.Surface] = self.fade_images(radius, colors, self.FADES)
+
+        # The images grow as they fade, so each is drawn centered by half its size
+        self.__centers: numpy.ndarray = numpy.array([image.get_width() // 2 for image in self.images], numpy.intp)
+
+    @staticmethod
+    def fade_images(radius: int, colors: typing.Sequence[pygame.Color], fades: int) -> typing.List[pygame.Surface]:
+        """Returns the image of a particle at every step of its life, fading out and through the colors"""
+        images = []
+
+        for fade in range(fades):
+            progress = fade / max(fades - 1, 1)
+
+            # Interpolate between the two colors progress is between
+            position = progress * (len(colors) - 1)
+            index = min(int(position), max(len(colors) - 2, 0))
+            start, end = colors[index], colors[min(index + 1, len(colors) - 1)]
+            amount = position - index
+
+            color = pygame.Color(*(round(a + (b - a) * amount) for a, b in zip(start[:3], end[:3])),
+                                 round(255 * (1 - progress)))
+
+            size = max(round(radius * (1 + progress)), 1)
+            image = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+            pygame.draw.circle(image, color, (size, size), size)
+
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+
+            images.append(image)
+
+        return images
+
+    @property
+    def alive(self) -> numpy.ndarray:
+        """Getter for the alive attribute of these Particles, the indices of the living particles"""
+        return numpy.flatnonzero(self.age < self.life)
+
+    def __len__(self) -> int:
+        """Returns the amount of living particles"""
+        return int(numpy.count_nonzero(self.age < self.life))
+
+    def emit(self, count: float, position: typing.Tuple[float, float], velocity: typing.Tuple[float, float],
+             spread: typing.Tuple[float, float] = (1.0, 1.0)) -> int:
+        """
+        Emit particles at a position, scaled by the emission rate, returns the amount emitted
+        count: the particles to emit at the full rate, fractions are carried over to the next emit
+        spread: the standard deviation of the velocity of the particles
+        """
+        self.__owed += count * self.emission
+        amount = min(int(self.__owed), self.capacity)
+        self.__owed -= int(self.__owed)
+
+        if not amount:
+            return 0
+
+        indices = (self.__next + numpy.arange(amount)) % self.capacity
+        self.__next = (self.__next + amount) % self.capacity
+
+        self.x[indices] = position[0]
+        self.y[indices] = position[1]
+        self.dx[indices] = self.random.normal(velocity[0], spread[0], amount)
+        self.dy[indices] = self.random.normal(velocity[1], spread[1], amount)
+        self.age[indices] = 0
+        self.life[indices] = self.random.integers(self.lifetime[0], self.lifetime[1], amount, endpoint=True)
+
+        return amount
+
+    def update(self, scroll: float = 0) -> None:
+        """Move every particle by one frame, scroll is the pixels the world scrolled"""
+        self.dy += self.gravity
+        self.x += self.dx
+        self.x -= scroll
+        self.y += self.dy
+        self.age += 1
+
+    def clear(self, seed: typing.Optional[int] = None) -> None:
+        """Kill every particle, and seed the particles emitted next again if seed is given"""
+        if seed is not None:
+            self.random = numpy.random.default_rng(seed)
+
+        self.age.fill(0)
+        self.life.fill(0)
+        self.__owed = 0.0
+
+    def adapt(self, frame_time: float, budget: float = 1 / 60, lowest: float = 0.1) -> None:
+        """
+        Lower the emission rate while frames take longer than the budget in seconds, and raise it again after
+        lowest: the lowest fraction of the emission rate
+        """
+        if frame_time > budget:
+            self.emission = max(self.emission * 0.8, lowest)
+        else:
+            self.emission = min(self.emission + 0.02, 1.0)
+
+    def draw(self, surface: pygame.Surface) -> None:
+        """Draw every living particle onto a surface"""
+        alive = self.alive
+
+        if not len(alive):
+            return
+
+        fades = (self.age[alive] * self.FADES / self.life[alive]).astype(numpy.intp)
+        numpy.minimum(fades, self.FADES - 1, out=fades)
+
+        centers = self.__centers[fades]
+
+        xs = (self.x[alive] - centers).astype(numpy.intp).tolist()
+        ys = (self.y[alive] - centers).astype(numpy.intp).tolist()
+
+        images = self.images
+        surface.blits(zip(map(images.__getitem__, fades.tolist()), zip(xs, ys)), doreturn=False)
@@ -0,0 +1,216 @@
+"""Race mode, a local player against ghosts through one shared world"""
+
+import os
+import sys
+import copy
+import random
+import struct
+import typing
+import argparse
+
+import pygame
+
+import render
+import pacing
+import loading
+import controls
+import animation
+import sprites
+import world
+
+Policy = typing.Callable[[sprites.Player], bool]
+
+
+def ghost_animation(anime: animation.Animation, alpha: int) -> animation.Animation:
+    """
+    Make a see-through copy of an animation
+    The masks of the copied frames are the masks of the original frames, so ghosts collide exactly like players
+    """
+    sections = []
+
+    for section in anime.sections:
+        frames = []
+
+        for frame in section.frames:
+            ghost_frame = frame.copy()
+            ghost_frame.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+
+            loading.MASKS[ghost_frame] = loading.mask(frame)
+            frames.append(ghost_frame)
+
+        sections.append(animation.Section(tuple(frames), copy.deepcopy(section.loop_state)))
+
+    return animation.Animation(sections, copy.deepcopy(anime.loop_state))
+
+
+class Replay:
+    """A class representing replays, the seed of a world and the input of a player on every frame"""
+
+    HEADER = struct.Struct("<I")
+
+    def __init__(self, seed: int, inputs: typing.Optional[typing.List[bool]] = None):
+        """Initializer for the Replay class"""
+        if inputs is None:
+            inputs = []
+
+        self.seed: int = seed
+        self.inputs: typing.List[bool] = inputs
+
+    def record(self, flying: bool) -> None:
+        """Record the input of one frame"""
+        self.inputs.append(flying)
+
+    def policy(self) -> Policy:
+        """Returns a policy that plays this Replay back"""
+        inputs = iter(self.inputs)
+        return lambda player: next(inputs, False)
+
+    def save(self, path: str) -> None:
+        """Save this Replay to a file"""
+        with open(path, "wb") as file:
+            file.write(self.HEADER.pack(self.seed))
+            file.write(bytes(self.inputs))
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a replay from a file"""
+        with open(path, "rb") as file:
+            data = file.read()
+
+        seed, = cls.HEADER.unpack_from(data)
+        return cls(seed, [bool(value) for value in data[cls.HEADER.size:]])
+
+
+class RandomPolicy:
+    """A class representing random policies, which switch between flying and falling at random"""
+
+    def __init__(self, switch_chance: float = 0.05, seed: typing.Optional[int] = None):
+        """
+        Initializer for the RandomPolicy class
+        switch_chance: the chance of switching between flying and falling every frame
+        """
+        self.switch_chance: float = switch_chance
+        self.random: random.Random = random.Random(seed)
+        self.flying: bool = False
+
+    def __call__(self, player: sprites.Player) -> bool:
+        """__call__ method for this RandomPolicy"""
+        if self.random.random() < self.switch_chance:
+            self.flying = not self.flying
+
+        return self.flying
+
+
+class Ghost(sprites.Player):
+    """A class representing ghost sprites, players controlled by a policy, inherits from Player"""
+
+    ALPHA: int = 96
+
+    # Every ghost draws from the same see-through frames
+    ANIMATION: loading.Asset[animation.Animation] = loading.Asset.derived(
+        lambda: ghost_animation(sprites.Player.ANIMATION, Ghost.ALPHA)
+    )
+
+    SILENT = True
+
+    def __init__(self, policy: Policy, **kwargs):
+        """Initializer for the Ghost class"""
+        self.policy: Policy = policy
+
+        super().__init__(**kwargs)
+
+    def update(self, *args):
+        """update method for this Ghost"""
+        if not self.dead:
+            self.input = bool(self.policy(self))
+
+        super().update(*args)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None):
+    """This function defines the mainline logic for race mode"""
+    parser = argparse.ArgumentParser(description="Race against ghosts in one shared world")
+    parser.add_argument("replays", nargs="*", help="replay files to race against")
+    parser.add_argument("--random", type=int, default=0, help="amount of ghosts with a random policy")
+    parser.add_argument("--record", help="file to save the replay of this run to")
+    args = parser.parse_args(argv)
+
+    replays = [Replay.load(path) for path in args.replays]
+
+    # Replays only match the world they were recorded in
+    seed = replays[0].seed if replays else None
+
+    pygame.init()
+
+    # D - Display
+    screen: pygame.Surface = pygame.display.set_mode((1000, 480))
+    pygame.display.set_caption("Jetpack Joyride - Race")
+
+    loader = loading.Loader(cache=loading.FrameCache())
+    loader.start()
+    loader.wait()
+
+    # E - Entities
+
+    # Music
+    pygame.mixer.music.load(os.path.join("assets", "audio", "music.wav"))
+    pygame.mixer.music.play(-1)
+
+    game_world = world.World(screen, seed)
+
+    # Ghosts
+    for path, replay in zip(args.replays, replays):
+        game_world.spawn_player(Ghost, name=os.path.basename(path), policy=replay.policy())
+
+    for index in range(args.random):
+        game_world.spawn_player(Ghost, name="Random %d" % (index + 1), policy=RandomPolicy(seed=index))
+
+    # Players
+    player = game_world.spawn_player(name="Player")
+
+    renderer = render.Renderer()
+
+    # Input
+    player_controls = controls.Controls()
+    player_controls.allow()
+
+    pacer = pacing.Pacer()
+
+    # A - Assign Variables
+    replay = Replay(game_world.seed)
+    keep_going = True
+
+    # Hide the mouse pointer
+    pygame.mouse.set_visible(False)
+
+    while keep_going:
+
+        # T - Time
+        pacer.wait(player_controls.sleep)
+
+        # E - Event Handling, as late as possible before the world steps
+        keep_going = player_controls.latch(player)
+
+        if not player.dead:
+            replay.record(player.input)
+
+        game_world.step()
+
+        # Check if all players are dead
+        if game_world.over:
+            pygame.mixer.music.stop()
+
+        # R - Refresh Screen
+        renderer.draw(screen, game_world.game_sprites, (game_world.exhaust,))
+
+        pygame.display.flip()
+
+    if args.record is not None:
+        replay.save(args.record)
+
+    pygame.mouse.set_visible(True)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
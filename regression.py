@@ -0,0 +1,295 @@
+"""Performance regression check against a committed baseline, runs headless"""
+
+import os
+import sys
+import json
+import time
+import random
+import typing
+import argparse
+import statistics
+import contextlib
+import tracemalloc
+
+# Run without a window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import env
+import render
+import world
+import stress
+import loading
+import sprites
+import difficulty
+
+BASELINE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+
+# Slower or bigger by this fraction of the baseline is a regression
+TOLERANCE: float = 0.5
+
+# Growth this small never counts as a regression, so a baseline of almost nothing is not too strict
+SLACK: typing.Dict[str, float] = {"blocks": 8, "retained": 4096}
+
+Results = typing.Dict[str, typing.Dict[str, float]]
+
+
+class PhaseTimer:
+    """
+    A class representing phase timers, which time every call of the phases of a frame
+    With memory, the blocks every call allocates and still holds are counted instead of the time
+    """
+
+    def __init__(self, memory: bool = False):
+        """Initializer for the PhaseTimer class"""
+        self.memory: bool = memory
+
+        self.times: typing.Dict[str, typing.List[float]] = {}
+        self.blocks: typing.Dict[str, typing.List[int]] = {}
+
+        # The snapshot every phase that is running started from, innermost last
+        self.__snapshots: typing.List[tracemalloc.Snapshot] = []
+
+    @staticmethod
+    def snapshot() -> tracemalloc.Snapshot:
+        """Returns a snapshot of the traced blocks, without the ones of the snapshots themselves"""
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time or count the allocations of the code run inside the with statement"""
+        if self.memory and not tracemalloc.is_tracing():
+            # Warming up before tracing starts
+            yield
+
+        elif self.memory:
+            self.__snapshots.append(self.snapshot())
+
+            yield
+
+            statistics_diff = self.snapshot().compare_to(self.__snapshots.pop(), "lineno")
+            self.blocks.setdefault(name, []).append(sum(max(stat.count_diff, 0) for stat in statistics_diff))
+        else:
+            start = time.perf_counter()
+
+            yield
+
+            self.times.setdefault(name, []).append(time.perf_counter() - start)
+
+    def wrap(self, name: str, function: typing.Callable) -> typing.Callable:
+        """Returns function wrapped so every call of it is a phase"""
+        def wrapped(*args, **kwargs):
+            with self.phase(name):
+                return function(*args, **kwargs)
+
+        return wrapped
+
+
+def session(timer: PhaseTimer, ticks: int = 600, seed: int = 0, warmup: int = 60) -> int:
+    """
+    Run a fixed seed session at the top tier, with immortal players so it lasts every tick
+    Returns the bytes still traced after the session that were not before it, if tracing
+    """
+    pygame.init()
+
+    loading.load_all()
+
+    curve = difficulty.Difficulty()
+    screen = pygame.Surface(env.Environment.SCREEN_SIZE)
+    renderer = render.Renderer()
+
+    game_world = world.World(screen, seed, curve=curve)
+    game_world.pixels = curve.top.distance
+    game_world.apply_tier()
+
+    agent = game_world.spawn_player(stress.Immortal)
+    policy = random.Random(seed)
+
+    # The phases inside a step
+    game_world.collide = timer.wrap("collide", game_world.collide)
+    game_world.game_sprites.update = timer.wrap("update", game_world.game_sprites.update)
+
+    # Sprites on their own, driven by the frames of the player
+    frames = [frame for section in agent.animation.sections for frame in section.frames]
+    generic = sprites.GenericSprite(image=frames[0], position=(0, 0))
+    animated = sprites.AnimatedSprite(anime=agent.animation, speed=0, position=(0, 0))
+
+    retained = 0
+
+    for tick in range(warmup + ticks):
+        if tick == warmup:
+            timer.times.clear()
+            timer.blocks.clear()
+
+            # Traced from here, so snapshots only hold what the measured ticks allocated
+            if timer.memory:
+                tracemalloc.start()
+                retained = -tracemalloc.get_traced_memory()[0]
+
+        if policy.random() < 0.05:
+            agent.act(env.FALL if agent.input else env.FLY)
+
+        with timer.phase("step"):
+            game_world.step()
+
+        with timer.phase("render"):
+            renderer.draw(screen, game_world.game_sprites, (game_world.exhaust,))
+
+        with timer.phase("generic_sprite"):
+            for frame in frames:
+                generic.image = frame
+
+        with timer.phase("animated_sprite"):
+            sprites.AnimatedSprite.update(animated)
+
+    if timer.memory:
+        retained += tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    return retained
+
+
+def calibrate(samples: int = 200) -> float:
+    """
+    Returns the median seconds of a fixed workload of blits and Python loops, run in the same process as the phases
+    Phases are timed relative to it, so a baseline from one machine holds on a faster or slower one
+    """
+    pygame.init()
+
+    screen = pygame.Surface(env.Environment.SCREEN_SIZE)
+    image = pygame.Surface((64, 64), pygame.SRCALPHA)
+    image.fill((255, 255, 255, 128))
+
+    rects = [pygame.Rect(index * 37 % 1000, index * 23 % 480, 64, 64) for index in range(200)]
+    times = []
+
+    for _ in range(samples):
+        start = time.perf_counter()
+
+        screen.fill((0, 0, 0))
+        screen.blits([(image, rect) for rect in rects], doreturn=False)
+
+        for rect in rects:
+            rect.move_ip(1, 0)
+            rect.colliderect(screen.get_clip())
+
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+
+def measure(ticks: int = 600, seed: int = 0, repeat: int = 3) -> Results:
+    """
+    Returns the median time of every phase relative to the calibration workload, and the median memory blocks every
+    call allocates and keeps
+    The session and the calibration are run repeat times, and the fastest median of each is kept, as noise only slows
+    them down
+    """
+    results: Results = {}
+    calibration = min(calibrate() for _ in range(repeat))
+
+    for _ in range(repeat):
+        timer = PhaseTimer()
+        session(timer, ticks, seed)
+
+        for name, times in timer.times.items():
+            relative = statistics.median(times) / calibration
+            phase = results.setdefault(name, {"relative": relative})
+            phase["relative"] = min(phase["relative"], relative)
+
+    timer = PhaseTimer(memory=True)
+    retained = session(timer, ticks, seed)
+
+    for name, blocks in timer.blocks.items():
+        results[name]["blocks"] = statistics.median(blocks)
+
+    results["session"] = {"retained": retained}
+    results["calibration"] = {"time": calibration}
+
+    return results
+
+
+def compare(results: Results, baseline: Results, tolerance: float = TOLERANCE) -> typing.List[str]:
+    """Returns a message for every metric of results that regressed from the baseline"""
+    regressions = []
+
+    for name, metrics in sorted(baseline.items()):
+        for metric, expected in sorted(metrics.items()):
+            # Absolute times only hold on the machine they were measured on
+            if metric == "time":
+                continue
+
+            try:
+                actual = results[name][metric]
+            except KeyError:
+                regressions.append("%s %s was not measured" % (name, metric))
+                continue
+
+            limit = max(expected * (1 + tolerance), expected + SLACK.get(metric, 0))
+
+            if actual > limit:
+                regressions.append("%s %s regressed: %s, baseline %s, limit %s" % (
+                    name, metric, format_metric(metric, actual), format_metric(metric, expected),
+                    format_metric(metric, limit)
+                ))
+
+    return regressions
+
+
+def format_metric(metric: str, value: float) -> str:
+    """Returns a metric as text with its unit"""
+    if metric == "time":
+        return "%.3f ms" % (value * 1000)
+    if metric == "relative":
+        return "%.3fx" % value
+    if metric == "blocks":
+        return "%d blocks" % value
+    return "%d B" % value
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Measure the phases of a frame and compare them to the baseline, returns 1 if any regressed"""
+    parser = argparse.ArgumentParser(description="Performance regression check")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--update", action="store_true", help="write the measurements as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = measure(args.ticks, args.seed, args.repeat)
+
+    for name, metrics in sorted(results.items()):
+        print("%-16s %s" % (name, ", ".join(
+            "%s %s" % (metric, format_metric(metric, value)) for metric, value in sorted(metrics.items())
+        )))
+
+    if args.update:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=4, sort_keys=True)
+            file.write("\n")
+
+        print("Wrote the baseline to %s" % args.baseline)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    for regression in regressions:
+        print("REGRESSION: %s" % regression, file=sys.stderr)
+
+    if regressions:
+        print("%d performance regressions against %s" % (len(regressions), args.baseline), file=sys.stderr)
+        return 1
+
+    print("No performance regressions against %s" % args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,120 @@
+"""Renderers"""
+
+import typing
+
+import pygame
+
+import sprites
+
+DrawList = typing.List[typing.Tuple[pygame.Surface, pygame.Rect]]
+
+
+class Drawable(typing.Protocol):
+    """A class representing things that draw themselves onto a surface in a layer, other than sprites"""
+
+    layer: int
+
+    def draw(self, surface: pygame.Surface) -> None:
+        """Draw onto a surface"""
+
+
+class Renderer:
+    """
+    A class representing batched renderers
+    Sprites are collected into one (image, rect) draw list per layer, each submitted with a single Surface.blits call
+    """
+
+    def __init__(self, cull: bool = True):
+        """
+        Initializer for the Renderer class
+        cull: skip screen sprites that are outside the surface if True
+        """
+        self.cull: bool = cull
+
+        # The draw lists are kept between frames and only cleared, so their storage is reused
+        self.__draw_lists: typing.Dict[int, DrawList] = {}
+        self.__layers: typing.List[int] = []
+
+        # The image and rect of every sprite of the last frame drawn with changed_only
+        self.__last_frame: typing.Optional[typing.List[tuple]] = None
+
+    @property
+    def draw_lists(self) -> typing.Dict[int, DrawList]:
+        """Getter for the draw_lists attribute of this Renderer"""
+        return self.__draw_lists
+
+    def __draw_list(self, layer: int) -> DrawList:
+        """draw_list method for this Renderer"""
+        try:
+            return self.__draw_lists[layer]
+        except KeyError:
+            draw_list: DrawList = []
+
+            self.__draw_lists[layer] = draw_list
+            self.__layers = sorted(self.__draw_lists)
+
+            return draw_list
+
+    def collect(self, surface: pygame.Surface, group: pygame.sprite.AbstractGroup) -> None:
+        """Fill the draw lists with the sprites of a group"""
+        for draw_list in self.__draw_lists.values():
+            draw_list.clear()
+
+        bounds = surface.get_clip()
+        cull = self.cull
+
+        layer = None
+        draw_list = None
+
+        for sprite in group.sprites():
+            rect = sprite.rect
+
+            # Same test as ScreenSprite.outside, without the chain of property lookups
+            if cull and isinstance(sprite, sprites.ScreenSprite) and not bounds.colliderect(rect):
+                continue
+
+            sprite_layer = getattr(sprite, "_layer", 0)
+
+            if sprite_layer != layer:
+                layer = sprite_layer
+                draw_list = self.__draw_list(layer)
+
+            draw_list.append((sprite.image, rect))
+
+    def draw(self, surface: pygame.Surface, group: pygame.sprite.AbstractGroup,
+             extras: typing.Sequence[typing.Optional[Drawable]] = (), changed_only: bool = False) -> bool:
+        """
+        Draw the sprites of a group onto a surface, back layer first, returns if it was drawn
+        extras: things drawn after the sprites of their layer, like particles, None is skipped
+        changed_only: only draw if there are extras or a sprite moved or changed image since the last frame drawn
+        with changed_only, as the surface would be the same
+        """
+        self.collect(surface, group)
+
+        extras = sorted((extra for extra in extras if extra is not None), key=lambda extra: extra.layer)
+        extra_index = 0
+
+        if changed_only:
+            frame = [(image, *rect) for layer in self.__layers for image, rect in self.__draw_lists[layer]]
+
+            if not extras and frame == self.__last_frame:
+                return False
+
+            self.__last_frame = frame
+        else:
+            self.__last_frame = None
+
+        for layer in self.__layers:
+            while extra_index < len(extras) and extras[extra_index].layer < layer:
+                extras[extra_index].draw(surface)
+                extra_index += 1
+
+            draw_list = self.__draw_lists[layer]
+
+            if draw_list:
+                surface.blits(draw_list, doreturn=False)
+
+        for extra in extras[extra_index:]:
+            extra.draw(surface)
+
+        return True
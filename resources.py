@@ -0,0 +1,300 @@
+"""Memory accounting of surfaces, masks, sounds and sprites"""
+
+import sys
+import typing
+import warnings
+
+import pygame
+
+import loading
+import animation
+import sprites
+import world
+
+# The kinds of memory accounted for
+SURFACES = "surfaces"
+MASKS = "masks"
+SOUNDS = "sounds"
+OBJECTS = "objects"
+
+KINDS: typing.Tuple[str, ...] = (SURFACES, MASKS, SOUNDS, OBJECTS)
+
+
+class BudgetWarning(UserWarning):
+    """A class representing budget warnings, warned when memory use goes over a Budget"""
+
+
+def surface_bytes(surface: pygame.Surface) -> typing.Tuple[pygame.Surface, int]:
+    """Returns the surface that owns the pixels of a surface, and the bytes of those pixels"""
+    parent = surface.get_abs_parent()
+    width, height = parent.get_size()
+
+    return parent, width * height * parent.get_bytesize()
+
+
+def mask_bytes(surface_mask: pygame.mask.Mask) -> int:
+    """Returns the bytes of the bits of a mask"""
+    return memoryview(surface_mask).nbytes
+
+
+def sound_bytes(sound: pygame.mixer.Sound) -> int:
+    """Returns the bytes of the samples of a sound"""
+    return memoryview(sound).nbytes
+
+
+def object_bytes(sprite: pygame.sprite.Sprite) -> int:
+    """Returns the bytes of a sprite object and its attributes, without the surfaces, masks and sounds"""
+    return sys.getsizeof(sprite) + sys.getsizeof(vars(sprite))
+
+
+def asset_surfaces(value) -> typing.Iterator[pygame.Surface]:
+    """Yields every surface of the value of an asset"""
+    if isinstance(value, pygame.Surface):
+        yield value
+    elif isinstance(value, animation.Animation):
+        for section in value.sections:
+            yield from section.frames
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from asset_surfaces(item)
+
+
+class Report:
+    """A class representing memory reports, the bytes of every kind of memory held by each owner"""
+
+    def __init__(self):
+        """Initializer for the Report class"""
+        self.owners: typing.Dict[str, typing.Dict[str, int]] = {}
+
+        # Zappers that should have been culled
+        self.leaked_zappers: int = 0
+
+        self.__counted: typing.Set[int] = set()
+
+    def count(self, owner: str, kind: str, key: object, size: int) -> None:
+        """Count the bytes of an object for an owner, objects shared between owners are counted by the first one"""
+        if id(key) in self.__counted:
+            return
+
+        self.__counted.add(id(key))
+
+        kinds = self.owners.setdefault(owner, dict.fromkeys(KINDS, 0))
+        kinds[kind] += size
+
+    @property
+    def totals(self) -> typing.Dict[str, int]:
+        """Getter for the totals attribute of this Report, the bytes of every kind of memory"""
+        totals = dict.fromkeys(KINDS, 0)
+
+        for kinds in self.owners.values():
+            for kind, size in kinds.items():
+                totals[kind] += size
+
+        return totals
+
+    @property
+    def total(self) -> int:
+        """Getter for the total attribute of this Report, the bytes of every kind of memory together"""
+        return sum(self.totals.values())
+
+    def to_dict(self) -> dict:
+        """Returns this Report as a dict that could be written as JSON"""
+        return {
+            "owners": {owner: dict(kinds) for owner, kinds in self.owners.items()},
+            "totals": self.totals,
+            "total": self.total,
+            "leaked_zappers": self.leaked_zappers
+        }
+
+    def __str__(self) -> str:
+        """Returns this Report as a table in KiB"""
+        lines = ["%-32s %s" % ("owner", " ".join("%10s" % kind for kind in KINDS))]
+
+        for owner, kinds in sorted(self.owners.items(), key=lambda item: -sum(item[1].values())):
+            lines.append("%-32s %s" % (owner, " ".join("%10.1f" % (kinds[kind] / 1024) for kind in KINDS)))
+
+        totals = self.totals
+        lines.append("%-32s %s" % ("total", " ".join("%10.1f" % (totals[kind] / 1024) for kind in KINDS)))
+
+        if self.leaked_zappers:
+            lines.append("%d leaked zappers" % self.leaked_zappers)
+
+        return "\n".join(lines)
+
+
+def report(game_world: world.World) -> Report:
+    """
+    Account for the memory held by the loaded assets, the mask cache and the sprites of a world
+    Assets are counted first, so sprites are only charged for the surfaces and masks they made themselves.
+    Reports walk every sprite, so they are made on request, like by a Budget every few seconds, and not every frame
+    """
+    result = Report()
+
+    for asset in loading.Asset.ASSETS:
+        if not asset.loaded:
+            continue
+
+        owner = "asset %s" % asset.name
+
+        for surface in asset_surfaces(asset.value):
+            parent, size = surface_bytes(surface)
+            result.count(owner, SURFACES, parent, size)
+
+            try:
+                surface_mask = loading.MASKS[surface]
+            except KeyError:
+                continue
+
+            result.count(owner, MASKS, surface_mask, mask_bytes(surface_mask))
+
+    live = set(game_world.game_sprites) | set(game_world.players) | set(game_world.backgrounds)
+
+    for sprite in live:
+        owner = type(sprite).__name__
+
+        result.count(owner, OBJECTS, sprite, object_bytes(sprite))
+
+        parent, size = surface_bytes(sprite.image)
+        result.count(owner, SURFACES, parent, size)
+        result.count(owner, MASKS, sprite.mask, mask_bytes(sprite.mask))
+
+        if isinstance(sprite, sprites.Player):
+            for sound in (sprite.jetpack_on_sound, sprite.death_sound):
+                if sound is not None:
+                    result.count(owner, SOUNDS, sound, sound_bytes(sound))
+
+    for image in sprites.Zapper.ASSEMBLED.values():
+        result.count("zapper lengths", SURFACES, image, surface_bytes(image)[1])
+
+        # Only masks that were made are counted, reporting never makes them
+        surface_mask = loading.MASKS.get(image)
+        if surface_mask is not None:
+            result.count("zapper lengths", MASKS, surface_mask, mask_bytes(surface_mask))
+
+    # Masks of surfaces no asset or sprite uses any more, like old scoreboard text
+    for surface_mask in list(loading.MASKS.values()):
+        result.count("mask cache", MASKS, surface_mask, mask_bytes(surface_mask))
+
+    # Zappers left of the cull line, or drawn without being scrolled
+    cull_line = game_world.screen.get_clip().left
+    scrolling = set(game_world.zappers)
+
+    for sprite in live:
+        if isinstance(sprite, sprites.Zapper) and (sprite not in scrolling or sprite.rect.right < cull_line):
+            result.leaked_zappers += 1
+
+    return result
+
+
+class Budget:
+    """
+    A class representing memory budgets, limits in bytes of every kind of memory
+    Going over warns and evicts what can be made again, backing off while the working set is still over
+    """
+
+    def __init__(self, total: typing.Optional[int] = None, limits: typing.Optional[typing.Dict[str, int]] = None,
+                 evict: bool = True):
+        """
+        Initializer for the Budget class
+        total: the most bytes of every kind together, no limit if None
+        limits: the most bytes of each kind, kinds without a limit are not limited
+        evict: if the asset caches are evicted when over the budget
+        """
+        self.total: typing.Optional[int] = total
+        self.limits: typing.Dict[str, int] = dict(limits or {})
+        self.evict: bool = evict
+
+        unknown = set(self.limits) - set(KINDS)
+        if unknown:
+            raise ValueError("Unknown kinds of memory %r" % sorted(unknown))
+
+        # The checks skipped after each check that could not get under the budget, and the checks left to skip
+        self.backoff: int = 0
+        self.__skipped: int = 0
+
+    def over(self, memory_report: Report) -> typing.List[str]:
+        """Returns a message for every limit a report is over"""
+        messages = []
+        totals = memory_report.totals
+
+        for kind, limit in self.limits.items():
+            if totals[kind] > limit:
+                messages.append("%s use %d bytes, the budget is %d bytes" % (kind, totals[kind], limit))
+
+        if self.total is not None and memory_report.total > self.total:
+            messages.append("memory use is %d bytes, the budget is %d bytes" % (memory_report.total, self.total))
+
+        if memory_report.leaked_zappers:
+            messages.append("%d zappers were not culled" % memory_report.leaked_zappers)
+
+        return messages
+
+    def enforce(self, game_world: world.World) -> typing.Optional[Report]:
+        """
+        Check the memory of a world against this Budget, warning and evicting if it is over, returns the report
+        Returns None without checking while backing off
+        """
+        if self.__skipped < self.backoff:
+            self.__skipped += 1
+            return None
+
+        self.__skipped = 0
+
+        memory_report = report(game_world)
+        messages = self.over(memory_report)
+
+        if not messages:
+            self.backoff = 0
+            return memory_report
+
+        for message in messages:
+            warnings.warn(message, BudgetWarning)
+
+        if self.evict and evict(game_world):
+            memory_report = report(game_world)
+
+        if self.over(memory_report):
+            self.backoff = self.backoff * 2 + 1
+        else:
+            self.backoff = 0
+
+        return memory_report
+
+
+def evict(game_world: world.World) -> int:
+    """
+    Evict what the caches can make again and nothing in a world uses, returns the amount evicted
+    Assets the game needs to start are never unloaded, as the next player or zapper spawned would load them again in
+    the middle of a frame, while the sprites alive kept the old images. Other assets are only unloaded if no sprite
+    uses them, then the zapper images of lengths no zapper has and the masks of surfaces nothing uses are dropped
+    """
+    used = set()
+
+    for sprite in (*game_world.game_sprites, *game_world.players, *game_world.zappers, *game_world.backgrounds):
+        used.add(sprite.image)
+
+        if isinstance(sprite, sprites.AnimatedSprite):
+            used.update(asset_surfaces(sprite.animation))
+
+    evicted = 0
+
+    for asset in loading.Asset.ASSETS:
+        if asset.loaded and not asset.required and asset.paths and used.isdisjoint(asset_surfaces(asset.value)):
+            asset.unload()
+            evicted += 1
+
+    for key, image in list(sprites.Zapper.ASSEMBLED.items()):
+        if image not in used:
+            del sprites.Zapper.ASSEMBLED[key]
+            evicted += 1
+
+    for asset in loading.Asset.ASSETS:
+        if asset.loaded:
+            used.update(asset_surfaces(asset.value))
+
+    for surface in list(loading.MASKS.keys()):
+        if surface not in used:
+            del loading.MASKS[surface]
+            evicted += 1
+
+    return evicted
@@ -0,0 +1,173 @@
+"""
+Snapshots of world state
+Exhaust particles are not part of a snapshot, restoring one clears them
+"""
+
+import array
+import struct
+
+import world
+import sprites
+
+MAGIC: bytes = b"JPSS"
+VERSION: int = 6
+
+# magic, version, dx, zapper distance, next zapper spacing, pixels, ticks, over, backgrounds, players, zappers
+WORLD = struct.Struct("<4sHiiiqq?III")
+
+# random version, has gauss next, gauss next, then the 625 ints of the Mersenne Twister
+RANDOM = struct.Struct("<I?d")
+RANDOM_STATE = struct.Struct("<625I")
+
+# exact x, exact y, dx
+BACKGROUND = struct.Struct("<ddd")
+
+# exact x, exact y, dx, dy, ddx, ddy, dead, input, jetpack, at bottom, at top, scoreboard pixels, animation cursor
+PLAYER = struct.Struct("<dddddd?????q13i")
+
+# killed, orientation, vertical, angled, angle, width, height, of the zapper that killed a player
+KILLER = struct.Struct("<????dii")
+
+# left, top, dx, dy, orientation, direction, angled, angle, spin, length or 0 for the length of the image
+ZAPPER = struct.Struct("<iiii???ddi")
+
+
+def take(game_world: world.World) -> bytes:
+    """Take a snapshot of a world, as bytes"""
+    players = list(game_world.scoreboards)
+    backgrounds = game_world.backgrounds.sprites()
+    zappers = game_world.zappers.sprites()
+
+    random_version, random_state, gauss_next = game_world.random.getstate()
+
+    chunks = [
+        WORLD.pack(MAGIC, VERSION, game_world.dx, game_world.zapper_distance, game_world.next_zapper_spacing,
+                   game_world.pixels, game_world.ticks, game_world.over, len(backgrounds), len(players), len(zappers)),
+        RANDOM.pack(random_version, gauss_next is not None, gauss_next or 0.0),
+        array.array("I", random_state).tobytes()
+    ]
+
+    for background in backgrounds:
+        chunks.append(BACKGROUND.pack(*background.exact_position, background.dx))
+
+    for player in players:
+        chunks.append(PLAYER.pack(*player.exact_position, player.dx, player.dy, player.ddx, player.ddy,
+                                  player.dead, player.input, player.jetpack, *player.edges,
+                                  game_world.scoreboards[player].pixels, *player.cursor))
+
+        killer = game_world.killers.get(player)
+        if killer is None:
+            chunks.append(KILLER.pack(False, False, False, False, 0.0, 0, 0))
+        else:
+            chunks.append(KILLER.pack(True, killer.orientation, killer.direction == "vertical",
+                                      killer.angle is not None, killer.angle or 0.0, *killer.size))
+
+    for zapper in zappers:
+        chunks.append(ZAPPER.pack(zapper.left, zapper.top, zapper.dx, zapper.dy,
+                                  zapper.orientation, zapper.direction, zapper.angle is not None,
+                                  zapper.angle or 0.0, zapper.spin, zapper.length or 0))
+
+    return b"".join(chunks)
+
+
+def restore(game_world: world.World, data: bytes) -> None:
+    """
+    Restore a world to a snapshot
+    The world must have the same players and backgrounds as the world the snapshot was taken of
+    """
+    (magic, version, dx, zapper_distance, next_zapper_spacing, pixels, ticks, over,
+     background_count, player_count, zapper_count) = WORLD.unpack_from(data)
+
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version %d snapshot" % VERSION)
+
+    players = list(game_world.scoreboards)
+    backgrounds = game_world.backgrounds.sprites()
+
+    if background_count != len(backgrounds) or player_count != len(players):
+        raise ValueError("The snapshot was taken of a world with different players or backgrounds")
+
+    offset = WORLD.size
+
+    # World
+    game_world.dx = dx
+    game_world.zapper_distance = zapper_distance
+    game_world.next_zapper_spacing = next_zapper_spacing
+    game_world.pixels = pixels
+    game_world.ticks = ticks
+
+    if over:
+        game_world.game_sprites.add(game_world.game_over)
+    else:
+        game_world.game_sprites.remove(game_world.game_over)
+
+    # Random
+    random_version, has_gauss_next, gauss_next = RANDOM.unpack_from(data, offset)
+    offset += RANDOM.size
+
+    random_state = RANDOM_STATE.unpack_from(data, offset)
+    offset += RANDOM_STATE.size
+
+    game_world.random.setstate((random_version, random_state, gauss_next if has_gauss_next else None))
+
+    # Backgrounds
+    for background in backgrounds:
+        x, y, background.dx = BACKGROUND.unpack_from(data, offset)
+        offset += BACKGROUND.size
+
+        background.exact_position = (x, y)
+
+    # Players
+    for player in players:
+        values = PLAYER.unpack_from(data, offset)
+        offset += PLAYER.size
+
+        x, y, dx, dy, ddx, ddy, dead, flying_input, jetpack, at_bottom, at_top, pixels = values[:12]
+
+        player.set_dead(dead, effects=False)
+        player.set_input(flying_input)
+        player.set_jetpack(jetpack)
+
+        player.velocity = (dx, dy)
+        player.acceleration = (ddx, ddy)
+        player.edges = (at_bottom, at_top)
+        player.cursor = values[12:]
+
+        # The position is set last, as changing the image keeps the old position
+        player.exact_position = (x, y)
+
+        game_world.scoreboards[player].pixels = pixels
+
+        killed, orientation, vertical, angled, angle, width, height = KILLER.unpack_from(data, offset)
+        offset += KILLER.size
+
+        if killed:
+            game_world.killers[player] = world.Killer(orientation, "vertical" if vertical else "horizontal",
+                                                      angle if angled else None, (width, height))
+        else:
+            game_world.killers.pop(player, None)
+
+    # Zappers
+    for zapper in game_world.zappers.sprites():
+        zapper.kill()
+
+    game_world.zappers.empty()
+
+    for _ in range(zapper_count):
+        left, top, dx, dy, orientation, direction, angled, angle, spin, length = ZAPPER.unpack_from(data, offset)
+        offset += ZAPPER.size
+
+        zapper = sprites.Zapper(
+            orientation=orientation, direction=direction, screen=game_world.screen, position=(left, top),
+            velocity=(dx, dy), angle=angle if angled else None, spin=spin, length=length or None
+        )
+
+        # The position is set last, as rotating keeps the center
+        zapper.position = (left, top)
+
+        game_world.zappers.add(zapper)
+
+    game_world.game_sprites.add(game_world.zappers)
+
+    if game_world.exhaust is not None:
+        game_world.exhaust.clear()
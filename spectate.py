@@ -0,0 +1,594 @@
+"""Spectator server streaming world state to viewers over TCP"""
+
+import os
+import sys
+import time
+import queue
+import socket
+import struct
+import typing
+import asyncio
+import weakref
+import argparse
+import threading
+
+import pygame
+
+import env
+import render
+import world
+import sprites
+import snapshot
+import difficulty
+
+# Messages are the length of their payload then the payload, whose first byte is its type
+LENGTH = struct.Struct("<I")
+
+KEYFRAME: int = 1
+DELTA: int = 2
+
+# type, amount of zappers, then the id of every zapper of the snapshot in order, then the snapshot
+KEYFRAME_HEADER = struct.Struct("<BI")
+ZAPPER_ID = struct.Struct("<I")
+
+# type, tick, pixels, pixels scrolled by the tick, over, backgrounds, players, spawned zappers, killed zapper ids
+DELTA_HEADER = struct.Struct("<Bqqi?BBHH")
+
+# exact x
+BACKGROUND = struct.Struct("<f")
+
+# exact x, exact y, dead, shown, image section, image frame, scoreboard pixels
+PLAYER = struct.Struct("<ff??bbq")
+
+# id, left, top, dx, dy, orientation, direction, angled, angle, spin, length or 0 for the length of the image
+SPAWN = struct.Struct("<Iiiii???ffi")
+
+# The state of a world at a tick that deltas are made of, captured on the main thread and encoded by the server
+Delta = typing.Tuple[int, int, int, bool, typing.List[float], typing.List[tuple], typing.List[tuple], typing.List[int]]
+
+
+def encode_delta(delta: Delta) -> bytes:
+    """Encode a delta as a message"""
+    ticks, pixels, scrolled, over, backgrounds, players, spawned, killed = delta
+
+    chunks = [
+        b"",
+        DELTA_HEADER.pack(DELTA, ticks, pixels, scrolled, over, len(backgrounds), len(players), len(spawned),
+                          len(killed))
+    ]
+
+    chunks.extend(BACKGROUND.pack(x) for x in backgrounds)
+    chunks.extend(PLAYER.pack(*player) for player in players)
+    chunks.extend(SPAWN.pack(*zapper) for zapper in spawned)
+    chunks.extend(ZAPPER_ID.pack(zapper_id) for zapper_id in killed)
+
+    chunks[0] = LENGTH.pack(sum(map(len, chunks)))
+
+    return b"".join(chunks)
+
+
+class Client:
+    """A class representing the clients of a Server, each with its own queue of messages"""
+
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int):
+        """Initializer for the Client class"""
+        self.writer: asyncio.StreamWriter = writer
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(queue_size)
+
+        # Deltas only make sense after a keyframe, which a client needs again whenever it falls behind
+        self.synced: bool = False
+        self.resyncs: int = 0
+
+
+class Server:
+    """
+    A class representing spectator servers, which stream the world to viewers from an asyncio loop in its own thread
+    The main thread only captures the few values a delta is made of, the server encodes and sends them.
+    A client that falls behind has its queued deltas dropped and gets a keyframe instead
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, queue_size: int = 120, send_buffer: int = 16384):
+        """
+        Initializer for the Server class
+        port: the port to listen on, any free port if 0
+        queue_size: the most messages waiting to be sent to a client before it is resynced with a keyframe
+        send_buffer: the bytes sent to a client that it has not read before the messages wait in its queue,
+        small so a client that stops reading is noticed instead of filling buffers
+        """
+        self.host: str = host
+        self.queue_size: int = queue_size
+        self.send_buffer: int = send_buffer
+
+        self.__port: int = port
+        self.__loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self.__thread: typing.Optional[threading.Thread] = None
+
+        # Only changed in the loop thread
+        self.__clients: typing.Set[Client] = set()
+
+        # Set by the loop thread, read by the main thread
+        self.__keyframe_wanted: bool = False
+
+        # Only used in the main thread
+        self.__ids: typing.MutableMapping[sprites.Zapper, int] = weakref.WeakKeyDictionary()
+        self.__next_id: int = 0
+        self.__previous: typing.Set[int] = set()
+        self.__tracking: bool = False
+        self.__published: typing.Optional[int] = None
+        self.__pixels: int = 0
+
+    @property
+    def port(self) -> int:
+        """Getter for the port attribute of this Server, the port it listens on once started"""
+        return self.__port
+
+    @property
+    def clients(self) -> int:
+        """Getter for the clients attribute of this Server, the amount of connected clients"""
+        return len(self.__clients)
+
+    def start(self) -> None:
+        """Start listening from the thread of the server"""
+        ready = threading.Event()
+
+        self.__thread = threading.Thread(target=self.__run, args=(ready,), name="Spectator", daemon=True)
+        self.__thread.start()
+
+        ready.wait()
+
+    def close(self) -> None:
+        """Disconnect every client and stop the thread of the server"""
+        if self.__thread is not None:
+            self.__loop.call_soon_threadsafe(self.__loop.stop)
+            self.__thread.join()
+            self.__thread = None
+
+    def publish(self, game_world: world.World) -> None:
+        """Send the state of a world after a step to every client, call from the main thread once per step"""
+        if not self.__clients:
+            self.__tracking = False
+            return
+
+        # A tick published again only sends keyframes, as its delta was sent already
+        fresh = game_world.ticks != self.__published
+        self.__published = game_world.ticks
+
+        delta = self.__capture(game_world) if self.__tracking and fresh else None
+
+        keyframe = None
+        if self.__keyframe_wanted or not self.__tracking:
+            self.__keyframe_wanted = False
+            keyframe = self.__keyframe(game_world)
+
+        self.__loop.call_soon_threadsafe(self.__broadcast, delta, keyframe)
+
+    def __zapper_id(self, zapper: sprites.Zapper) -> typing.Tuple[int, bool]:
+        """zapper_id method for this Server, returns the id of a zapper and if it is new"""
+        try:
+            return self.__ids[zapper], False
+        except KeyError:
+            zapper_id = self.__ids[zapper] = self.__next_id
+            self.__next_id += 1
+
+            return zapper_id, True
+
+    def __capture(self, game_world: world.World) -> Delta:
+        """capture method for this Server"""
+        spawned = []
+        current = set()
+
+        for zapper in game_world.zappers.sprites():
+            zapper_id, new = self.__zapper_id(zapper)
+            current.add(zapper_id)
+
+            if new:
+                spawned.append((zapper_id, zapper.left, zapper.top, zapper.dx, zapper.dy, zapper.orientation,
+                                zapper.direction, zapper.angle is not None, zapper.angle or 0.0, zapper.spin,
+                                zapper.length or 0))
+
+        killed = list(self.__previous - current)
+        self.__previous = current
+
+        players = [
+            (*player.exact_position, player.dead, player.alive(), *player.animation.frame_index(player.image),
+             scoreboard.pixels)
+            for player, scoreboard in game_world.scoreboards.items()
+        ]
+
+        backgrounds = [background.exact_position[0] for background in game_world.backgrounds.sprites()]
+
+        # The speed zappers moved at this tick, which changes with the tier and drops to 0 once the game is over
+        scrolled = game_world.pixels - self.__pixels
+        self.__pixels = game_world.pixels
+
+        return game_world.ticks, game_world.pixels, scrolled, game_world.over, backgrounds, players, spawned, killed
+
+    def __keyframe(self, game_world: world.World) -> bytes:
+        """keyframe method for this Server"""
+        zappers = game_world.zappers.sprites()
+        ids = [self.__zapper_id(zapper)[0] for zapper in zappers]
+
+        self.__previous = set(ids)
+        self.__tracking = True
+        self.__pixels = game_world.pixels
+
+        payload = b"".join([
+            KEYFRAME_HEADER.pack(KEYFRAME, len(ids)),
+            b"".join(ZAPPER_ID.pack(zapper_id) for zapper_id in ids),
+            snapshot.take(game_world)
+        ])
+
+        return LENGTH.pack(len(payload)) + payload
+
+    def __broadcast(self, delta: typing.Optional[Delta], keyframe: typing.Optional[bytes]) -> None:
+        """broadcast method for this Server, runs in the loop thread"""
+        message = encode_delta(delta) if delta is not None else None
+
+        for client in self.__clients:
+            if client.synced:
+                client_message = message
+            else:
+                client_message = keyframe
+                client.synced = keyframe is not None
+
+            if client_message is None:
+                continue
+
+            try:
+                client.queue.put_nowait(client_message)
+            except asyncio.QueueFull:
+                # Fell behind, drop what it has not been sent and send it a keyframe next
+                while not client.queue.empty():
+                    client.queue.get_nowait()
+
+                client.synced = False
+                client.resyncs += 1
+                self.__keyframe_wanted = True
+
+    async def __serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """serve method for this Server, sends the messages of a client as fast as it takes them"""
+        client = Client(writer, self.queue_size)
+
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        writer.transport.set_write_buffer_limits(self.send_buffer)
+
+        self.__clients.add(client)
+        self.__keyframe_wanted = True
+
+        try:
+            while True:
+                writer.write(await client.queue.get())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.__clients.discard(client)
+            writer.close()
+
+    def __run(self, ready: threading.Event) -> None:
+        """run method for this Server, runs in the thread of the server"""
+        self.__loop = loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        server = loop.run_until_complete(asyncio.start_server(self.__serve, self.host, self.__port))
+        self.__port = server.sockets[0].getsockname()[1]
+
+        ready.set()
+
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+
+class Spectated(sprites.Player):
+    """A class representing spectated sprites, players shown by a viewer, inherits from Player"""
+
+    SILENT = True
+
+
+class Viewer:
+    """A class representing viewers, which rebuild a world from the keyframes and deltas of a Server"""
+
+    def __init__(self, screen: pygame.Surface):
+        """Initializer for the Viewer class"""
+        self.screen: pygame.Surface = screen
+        self.renderer: render.Renderer = render.Renderer()
+
+        self.world: typing.Optional[world.World] = None
+        self.zappers: typing.Dict[int, sprites.Zapper] = {}
+
+        self.keyframes: int = 0
+        self.deltas: int = 0
+
+    def apply(self, payload: bytes) -> None:
+        """Apply the payload of a message"""
+        if payload[0] == KEYFRAME:
+            self.__keyframe(payload)
+        elif payload[0] == DELTA:
+            self.__delta(payload)
+        else:
+            raise ValueError("Unknown message type %d" % payload[0])
+
+    def draw(self) -> None:
+        """Draw the world onto the screen"""
+        if self.world is not None:
+            self.renderer.draw(self.screen, self.world.game_sprites)
+
+    def __keyframe(self, payload: bytes) -> None:
+        """keyframe method for this Viewer"""
+        _, zapper_count = KEYFRAME_HEADER.unpack_from(payload)
+        offset = KEYFRAME_HEADER.size
+
+        ids = [ZAPPER_ID.unpack_from(payload, offset + index * ZAPPER_ID.size)[0] for index in range(zapper_count)]
+        offset += zapper_count * ZAPPER_ID.size
+
+        data = payload[offset:]
+        player_count = snapshot.WORLD.unpack_from(data)[9]
+
+        if self.world is None or len(self.world.scoreboards) != player_count:
+            self.world = world.World(self.screen, exhaust=False)
+
+            for _ in range(player_count):
+                self.world.spawn_player(Spectated)
+
+        snapshot.restore(self.world, data)
+
+        # Players and scoreboards are only added to the sprites drawn when the world steps, which viewers never do
+        self.world.game_sprites.add(self.world.all_sprites)
+
+        self.zappers = dict(zip(ids, self.world.zappers.sprites()))
+        self.keyframes += 1
+
+    def __delta(self, payload: bytes) -> None:
+        """delta method for this Viewer"""
+        if self.world is None:
+            return
+
+        (_, ticks, pixels, scrolled, over, background_count, player_count,
+         spawned_count, killed_count) = DELTA_HEADER.unpack_from(payload)
+        offset = DELTA_HEADER.size
+
+        game_world = self.world
+
+        # Deltas of ticks the last keyframe already showed
+        if ticks <= game_world.ticks:
+            return
+
+        game_world.ticks = ticks
+        game_world.pixels = pixels
+
+        # Zappers move on their own at the speed of the tick, like World.step sets it
+        for zapper in self.zappers.values():
+            zapper.dx = -scrolled
+            zapper.update()
+
+        for background in game_world.backgrounds.sprites()[:background_count]:
+            x, = BACKGROUND.unpack_from(payload, offset)
+            offset += BACKGROUND.size
+
+            background.exact_position = (x, background.exact_position[1])
+
+        for player, scoreboard in list(game_world.scoreboards.items())[:player_count]:
+            x, y, dead, shown, section, frame, scoreboard_pixels = PLAYER.unpack_from(payload, offset)
+            offset += PLAYER.size
+
+            if dead != player.dead:
+                player.set_dead(dead, effects=False)
+
+            # Dead players are killed once their animation finishes
+            if not shown:
+                game_world.game_sprites.remove(player)
+
+            if section >= 0:
+                player.image = player.animation.sections[section].frames[frame]
+
+            player.exact_position = (x, y)
+            scoreboard.pixels = scoreboard_pixels
+
+        for _ in range(spawned_count):
+            (zapper_id, left, top, dx, dy, orientation, direction,
+             angled, angle, spin, length) = SPAWN.unpack_from(payload, offset)
+            offset += SPAWN.size
+
+            zapper = sprites.Zapper(
+                orientation=orientation, direction=direction, screen=game_world.screen, position=(left, top),
+                velocity=(dx, dy), angle=angle if angled else None, spin=spin, length=length or None
+            )
+            zapper.position = (left, top)
+
+            game_world.zappers.add(zapper)
+            game_world.game_sprites.add(zapper)
+            self.zappers[zapper_id] = zapper
+
+        for _ in range(killed_count):
+            zapper_id, = ZAPPER_ID.unpack_from(payload, offset)
+            offset += ZAPPER_ID.size
+
+            zapper = self.zappers.pop(zapper_id, None)
+            if zapper is not None:
+                zapper.kill()
+
+        if over:
+            game_world.game_sprites.add(game_world.game_over)
+        else:
+            game_world.game_sprites.remove(game_world.game_over)
+
+        self.deltas += 1
+
+
+async def watch(viewer: Viewer, host: str = "127.0.0.1", port: int = 8765,
+                until: typing.Callable[[Viewer], bool] = lambda viewer: False,
+                delay: float = 0.0, receive_buffer: typing.Optional[int] = None) -> None:
+    """
+    Apply every message of a server to a viewer until the server disconnects or until returns True
+    delay: the seconds to wait after every message, to act like a slow viewer
+    receive_buffer: the bytes received but not yet read that are buffered, the defaults of the system if None
+    """
+    if receive_buffer is None:
+        reader, writer = await asyncio.open_connection(host, port)
+    else:
+        # The receive buffer has to be set before connecting
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        client_socket.setblocking(False)
+
+        await asyncio.get_running_loop().sock_connect(client_socket, (host, port))
+        reader, writer = await asyncio.open_connection(sock=client_socket, limit=receive_buffer)
+
+    try:
+        while not until(viewer):
+            length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            viewer.apply(await reader.readexactly(length))
+
+            if delay:
+                await asyncio.sleep(delay)
+
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+
+def harness(ticks: int = 600, viewers: int = 4, slow: int = 1, seed: int = 0,
+            curve: typing.Optional[difficulty.Difficulty] = None, mortal: bool = False) -> int:
+    """
+    Run a world headless with a server on localhost and viewers in another thread, some of them slow,
+    returns 1 if a viewer does not end up showing the same world
+    mortal: if the player can die, so the world stops scrolling once it does
+    """
+    # Imported here, as stress sets up the dummy drivers the harness needs
+    import stress
+
+    pygame.init()
+    screen = pygame.Surface((1000, 480))
+
+    game_world = world.World(screen, seed, curve=curve, exhaust=False)
+    game_world.spawn_player(env.Agent if mortal else stress.Immortal)
+
+    first_tier = game_world.tier
+
+    # A short queue, so the slow viewers fall behind and are resynced
+    server = Server(queue_size=30, send_buffer=2048)
+    server.start()
+
+    final = game_world.ticks + ticks
+
+    results: "queue.SimpleQueue[typing.Tuple[int, Viewer]]" = queue.SimpleQueue()
+    def view():
+        async def run(index: int):
+            viewer = Viewer(pygame.Surface(screen.get_size()))
+            await watch(viewer, port=server.port, delay=0.01 if index < slow else 0.0,
+                        receive_buffer=2048 if index < slow else None,
+                        until=lambda viewer: viewer.world is not None and viewer.world.ticks >= final)
+            results.put((index, viewer))
+
+        async def run_all():
+            await asyncio.gather(*(run(index) for index in range(viewers)))
+
+        asyncio.run(run_all())
+
+    thread = threading.Thread(target=view, daemon=True)
+    thread.start()
+
+    while server.clients < viewers:
+        time.sleep(0.01)
+
+    publish_times = []
+
+    for _ in range(ticks):
+        game_world.step()
+
+        start = time.perf_counter()
+        server.publish(game_world)
+        publish_times.append(time.perf_counter() - start)
+
+        time.sleep(0.001)
+
+    # Keep publishing the last tick, so slow viewers get a keyframe if they fell behind
+    while thread.is_alive():
+        server.publish(game_world)
+        thread.join(0.05)
+
+    server.close()
+
+    expected = (
+        [player.rect.topleft for player in game_world.scoreboards],
+        sorted(zapper.rect.topleft for zapper in game_world.zappers),
+        [scoreboard.pixels for scoreboard in game_world.scoreboards.values()]
+    )
+
+    failures = 0
+
+    while not results.empty():
+        index, viewer = results.get()
+        shown = (
+            [player.rect.topleft for player in viewer.world.scoreboards],
+            sorted(zapper.rect.topleft for zapper in viewer.world.zappers),
+            [scoreboard.pixels for scoreboard in viewer.world.scoreboards.values()]
+        )
+
+        matches = shown == expected
+        failures += not matches
+
+        print("Viewer %d%s: %d keyframes, %d deltas, %s" % (
+            index, " (slow)" if index < slow else "", viewer.keyframes, viewer.deltas,
+            "matches" if matches else "does not match"
+        ))
+
+    if first_tier is not None:
+        print("Tier changed" if game_world.tier != first_tier else "Tier did not change")
+    if mortal:
+        print("Game over at %d pixels" % game_world.pixels if game_world.over else "Player survived")
+
+    publish_times.sort()
+    print("Publish time: p50 %.3f ms, max %.3f ms" % (
+        publish_times[len(publish_times) // 2] * 1000, publish_times[-1] * 1000
+    ))
+
+    return 1 if failures else 0
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """View a spectator server headless, saving the last frame, or run the localhost harness"""
+    parser = argparse.ArgumentParser(description="Jetpack Joyride spectator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--messages", type=int, default=600, help="messages to view before stopping")
+    parser.add_argument("--save", help="file to save the last frame to")
+    parser.add_argument("--harness", action="store_true", help="run a server and viewers on localhost")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    if args.harness:
+        # A curve that changes tier early, and a player that dies soon after
+        curve = difficulty.Difficulty((difficulty.Tier(0, 8, (300, 500), 1), difficulty.Tier(1600, 10, (300, 450), 1)))
+        return harness() | harness(curve=curve, mortal=True)
+
+    pygame.init()
+    viewer = Viewer(pygame.Surface((1000, 480)))
+
+    asyncio.run(watch(viewer, args.host, args.port,
+                      until=lambda viewer: viewer.keyframes + viewer.deltas >= args.messages))
+
+    if args.save is not None:
+        viewer.draw()
+        pygame.image.save(viewer.screen, args.save)
+
+    print("%d keyframes, %d deltas" % (viewer.keyframes, viewer.deltas))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
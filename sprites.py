@@ -7,10 +7,12 @@ import math
 import random
 import enum
 import typing
+import collections
 
 import pygame
 
 import helper
+import loading
 import animation
 
 pygame.font.init()
@@ -19,9 +21,14 @@ pygame.font.init()
 class GenericSprite(pygame.sprite.Sprite):
     """A class representing generic sprites, inherits from pygame.sprite.Sprite"""
 
+    # Static sprites never change on their own, so they start asleep and are skipped by ActivityGroup.update
+    STATIC: bool = False
+
     def __init__(self, image: pygame.Surface, position: typing.Tuple[int, int], layer: int = 0,
                  *groups: pygame.sprite.Group, **kwargs):
         """Initializer for the GenericSprite class"""
+        self.__awake: bool = not self.STATIC
+
         super().__init__(*groups)
 
         self.image = image
@@ -43,7 +50,8 @@ class GenericSprite(pygame.sprite.Sprite):
 
         self.__image: pygame.Surface = value
         self.__rect: pygame.Rect = self.__image.get_rect()
-        self.__mask: pygame.mask.Mask = pygame.mask.from_surface(self.image)
+        # Masks are shared between sprites with the same image
+        self.__mask: pygame.mask.Mask = loading.mask(value)
 
         self.position = position
 
@@ -127,6 +135,29 @@ class GenericSprite(pygame.sprite.Sprite):
         """Setter for the layer number of this GenericSprite"""
         self._layer = value
 
+    @property
+    def awake(self) -> bool:
+        """Getter for the awake attribute for this GenericSprite"""
+        return self.__awake
+
+    @awake.setter
+    def awake(self, value: bool):
+        """Setter for the awake attribute for this GenericSprite"""
+        if value != self.__awake:
+            self.__awake = value
+
+            for group in self.groups():
+                if isinstance(group, ActivityGroup):
+                    group.set_awake(self, value)
+
+    def wake(self) -> None:
+        """Wake this GenericSprite so it gets updated"""
+        self.awake = True
+
+    def sleep(self) -> None:
+        """Put this GenericSprite to sleep so it stops getting updated"""
+        self.awake = False
+
     def horizontally_center(self, start: int, end: int) -> None:
         """Horizontally center this GenericSprite between two x values"""
         self.left = round(((end + start) - self.size[0]) / 2)
@@ -136,6 +167,98 @@ class GenericSprite(pygame.sprite.Sprite):
         self.top = round(((end + start) - self.size[1]) / 2)
 
 
+class ActivityGroup(pygame.sprite.LayeredUpdates):
+    """A class representing groups that only update awake sprites, inherits from pygame.sprite.LayeredUpdates"""
+
+    def __init__(self, *sprites, **kwargs):
+        """Initializer for the ActivityGroup class"""
+        # A dict is used as an insertion ordered set
+        self.__awake_sprites: typing.Dict[pygame.sprite.Sprite, None] = {}
+
+        super().__init__(*sprites, **kwargs)
+
+    @property
+    def awake_sprites(self) -> typing.List[pygame.sprite.Sprite]:
+        """Getter for the awake_sprites attribute of this ActivityGroup"""
+        return list(self.__awake_sprites)
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, *args):
+        """add_internal method for this ActivityGroup"""
+        super().add_internal(sprite, *args)
+
+        if getattr(sprite, "awake", True):
+            self.__awake_sprites[sprite] = None
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite):
+        """remove_internal method for this ActivityGroup"""
+        super().remove_internal(sprite)
+
+        self.__awake_sprites.pop(sprite, None)
+
+    def set_awake(self, sprite: pygame.sprite.Sprite, value: bool) -> None:
+        """Called when a sprite of this ActivityGroup wakes up or goes to sleep"""
+        if value:
+            if self.has_internal(sprite):
+                self.__awake_sprites[sprite] = None
+        else:
+            self.__awake_sprites.pop(sprite, None)
+
+    def update(self, *args, **kwargs):
+        """update method for this ActivityGroup"""
+        for sprite in tuple(self.__awake_sprites):
+            sprite.update(*args, **kwargs)
+
+
+class ScrollingGroup(pygame.sprite.Group):
+    """
+    A class representing groups of sprites that scroll off the left of the screen in the order they were added,
+    inherits from pygame.sprite.Group
+    """
+
+    def __init__(self, screen: pygame.Surface, *sprites):
+        """Initializer for the ScrollingGroup class"""
+        self.screen: pygame.Surface = screen
+
+        self.__queue: typing.Deque[pygame.sprite.Sprite] = collections.deque()
+
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, *args):
+        """add_internal method for this ScrollingGroup"""
+        super().add_internal(sprite, *args)
+
+        self.__queue.append(sprite)
+
+    def empty(self):
+        """empty method for this ScrollingGroup"""
+        super().empty()
+
+        self.__queue.clear()
+
+    def cull(self) -> int:
+        """
+        Kill the sprites that scrolled past the left of the screen, returns the amount of sprites killed
+        Only the oldest sprites are checked, as every sprite scrolls at the same speed
+        """
+        killed = 0
+        queue = self.__queue
+        left = self.screen.get_clip().left
+
+        while queue:
+            sprite = queue[0]
+
+            if self.has_internal(sprite):
+                if sprite.rect.right >= left:
+                    break
+
+                sprite.kill()
+                killed += 1
+
+            queue.popleft()
+
+        return killed
+
+
 class AnimatedSprite(GenericSprite):
     """A class representing animated sprites, inherits from GenericSprite"""
     def __init__(self,
@@ -173,6 +296,43 @@ class AnimatedSprite(GenericSprite):
         """Getter for weather the animation is finished"""
         return self.__finished
 
+    @property
+    def cursor(self) -> typing.Tuple[int, ...]:
+        """
+        Getter for the cursor attribute of this AnimatedSprite, where the animation is at as a tuple of ints
+        (finished, frames passed, animation iterator state, section, section iterator state, image section, image frame)
+        """
+        if self.__section_iter is None:
+            section, section_state = -1, (0, int(animation.LoopType.BACK_TO_OTHER_END), 1, True)
+        else:
+            section = self.animation.sections.index(self.__section_iter.loopable)
+            section_state = self.__section_iter.state
+
+        return (self.__finished, self.__frames_passed, *self.__animation_iter.state, section, *section_state,
+                *self.animation.frame_index(self.image))
+
+    @cursor.setter
+    def cursor(self, value: typing.Tuple[int, ...]):
+        """Setter for the cursor attribute of this AnimatedSprite"""
+        self.__finished = bool(value[0])
+        self.__frames_passed = value[1]
+
+        self.__animation_iter.state = value[2:6]
+
+        section = value[6]
+        if section < 0:
+            self.__section_iter = None
+        else:
+            self.__section_iter = animation.LoopableIter(self.animation.sections[section])
+            self.__section_iter.state = value[7:11]
+
+        # The image is the empty one it starts with until the animation shows its first frame
+        image_section, image_frame = value[11:13]
+        if image_section >= 0:
+            self.image = self.animation.sections[image_section].frames[image_frame]
+        else:
+            self.image = pygame.Surface((0, 0))
+
     def restart(self, starting_frame: typing.Tuple[typing.Optional[int], typing.Optional[int]] = (None, None)):
         """Restart the animation, the starting section and frame could optionally be specified is a tuple of two ints"""
         self.__finished = False
@@ -219,6 +379,11 @@ class MovingSprite(GenericSprite):
 
         self.velocity = velocity
 
+        # The position is kept as floats and rounded into the rect once per update
+        self.__x: float = float(self.rect.x)
+        self.__y: float = float(self.rect.y)
+        self.__projected: typing.Tuple[int, int] = (self.rect.x, self.rect.y)
+
     @property
     def dx(self) -> int:
         """Getter for the delta x per frame attribute of this MovingSprite"""
@@ -249,12 +414,45 @@ class MovingSprite(GenericSprite):
         """Getter for the velocity attribute of this MovingSprite"""
         self.dx, self.dy = value
 
+    @property
+    def exact_position(self) -> typing.Tuple[float, float]:
+        """Getter for the exact_position attribute of this MovingSprite, the position with sub-pixel precision"""
+        self.__sync()
+        return self.__x, self.__y
+
+    @exact_position.setter
+    def exact_position(self, value: typing.Tuple[float, float]):
+        """Setter for the exact_position attribute of this MovingSprite"""
+        self.__x, self.__y = value
+        self.__project()
+
+    def __sync(self) -> None:
+        """sync method for this MovingSprite, takes the position of the rect if it was moved from outside"""
+        rect = self.rect
+        x, y = self.__projected
+
+        if rect.x != x:
+            self.__x = float(rect.x)
+        if rect.y != y:
+            self.__y = float(rect.y)
+
+    def __project(self) -> None:
+        """project method for this MovingSprite, rounds the exact position into the rect"""
+        rect = self.rect
+        rect.topleft = (self.__x, self.__y)
+
+        self.__projected = (rect.x, rect.y)
+
     def update(self, *args):
         """Update method for this MovingSprite"""
         super().update(*args)
 
-        self.left += self.dx
-        self.top += self.dy
+        self.__sync()
+
+        self.__x += self.dx
+        self.__y += self.dy
+
+        self.__project()
 
 
 class AcceleratingSprite(MovingSprite):
@@ -350,6 +548,16 @@ class ScreenSprite(GenericSprite):
         """Getter for the screen_bottom attribute of this ScreenSprite"""
         return self.screen_size[1] - 1
 
+    @property
+    def edges(self) -> typing.Tuple[bool, bool]:
+        """Getter for the edges attribute of this ScreenSprite, if it was at the bottom and top last update"""
+        return self.__at_bottom, self.__at_top
+
+    @edges.setter
+    def edges(self, value: typing.Tuple[bool, bool]):
+        """Setter for the edges attribute of this ScreenSprite"""
+        self.__at_bottom, self.__at_top = value
+
     def on_hit_bottom(self) -> None:
         """Called when this ScreenSprite hits the bottom of the screen"""
         pass
@@ -442,6 +650,8 @@ class KillIfOutOfScreenSprite(ScreenSprite):
 class TextSprite(GenericSprite):
     """A class representing text sprites, inherits from GenericSprite"""
 
+    STATIC = True
+
     def __init__(self, font: pygame.font.Font, text: str,
                  color: pygame.Color = pygame.Color(0, 0, 0, 0),
                  background_color: typing.Optional[pygame.Color] = None,
@@ -619,7 +829,10 @@ class Scoreboard(TextSprite):
         """Setter for the length in pixels of the player's distance of this Scoreboard"""
         self.__pixels: int = value
 
-        self.text = self.score_text % round(self.distance)
+        # Only render again if the text changed, as the distance is rounded
+        text = self.score_text % round(self.distance)
+        if text != self.text:
+            self.text = text
 
     @property
     def distance(self) -> float:
@@ -645,7 +858,7 @@ class PlayerAnimationState(enum.IntEnum):
 class Player(AnimatedSprite, InScreenSprite, AcceleratingSprite):
     """A class representing player sprites, inherits from AnimatedSprite, InScreenSprite, AcceleratingSprite"""
 
-    ANIMATION = animation.Animation.from_directory(
+    ANIMATION: loading.Asset[animation.Animation] = loading.Asset.animation(
         os.path.join("assets", "sprites", "player"),
         section_loopstates=[
             animation.LoopState(iterations=-1),
@@ -653,12 +866,16 @@ class Player(AnimatedSprite, InScreenSprite, AcceleratingSprite):
             animation.LoopState(iterations=-1),
             animation.LoopState(loop_type=animation.LoopType.REPEAT_LAST_FRAME, iterations=-1),
             animation.LoopState(loop_type=animation.LoopType.REPEAT_LAST_FRAME, iterations=-1)
-        ]
+        ],
+        packed=True
     )
 
     FLY_ACCELERATION = -0.5
     FALL_ACCELERATION = 0.5
 
+    # Silent players don't load or play any sounds
+    SILENT: bool = False
+
     def __init__(self, **kwargs):
         """Initializer for the Player class"""
         super().__init__(anime=self.ANIMATION,
@@ -667,11 +884,29 @@ class Player(AnimatedSprite, InScreenSprite, AcceleratingSprite):
                          starting_section=PlayerAnimationState.FALLING,
                          **kwargs)
 
-        self.jetpack_on_sound = pygame.mixer.Sound(os.path.join("assets", "audio", "jetpack_on.wav"))
-        self.death_sound = pygame.mixer.Sound(os.path.join("assets", "audio", "death.wav"))
+        if self.SILENT:
+            self.jetpack_on_sound: typing.Optional[pygame.mixer.Sound] = None
+            self.death_sound: typing.Optional[pygame.mixer.Sound] = None
+        else:
+            self.jetpack_on_sound = pygame.mixer.Sound(os.path.join("assets", "audio", "jetpack_on.wav"))
+            self.death_sound = pygame.mixer.Sound(os.path.join("assets", "audio", "death.wav"))
 
+        self.__input: bool = False
+        self.__jetpack: bool = False
         self.dead = False
 
+    @staticmethod
+    def play_sound(sound: typing.Optional[pygame.mixer.Sound], loops: int = 0) -> None:
+        """Play a sound of this Player if it has one"""
+        if sound is not None:
+            sound.play(loops)
+
+    @staticmethod
+    def stop_sound(sound: typing.Optional[pygame.mixer.Sound]) -> None:
+        """Stop a sound of this Player if it has one"""
+        if sound is not None:
+            sound.stop()
+
     def on_hit_bottom(self) -> None:
         """on_hit_bottom method for this Player"""
         if not self.dead and not self.flying:
@@ -692,14 +927,33 @@ class Player(AnimatedSprite, InScreenSprite, AcceleratingSprite):
     def flying(self, value: bool):
         """Setter for the flying attribute of this Player"""
         if not self.dead:
+            self.__jetpack = value
+
             if value:
                 self.ddy = self.FLY_ACCELERATION
                 self.restart((PlayerAnimationState.TAKING_OFF, None))
-                self.jetpack_on_sound.play(-1)
+                self.play_sound(self.jetpack_on_sound, -1)
             else:
                 self.ddy = self.FALL_ACCELERATION
                 self.restart((PlayerAnimationState.FALLING, None))
-                self.jetpack_on_sound.stop()
+                self.stop_sound(self.jetpack_on_sound)
+
+    @property
+    def jetpack(self) -> bool:
+        """Getter for the jetpack attribute of this Player, True while the jetpack fires, even against the top"""
+        return self.__jetpack and not self.dead
+
+    @property
+    def input(self) -> bool:
+        """Getter for the input attribute of this Player, True while the jetpack is held on"""
+        return self.__input
+
+    @input.setter
+    def input(self, value: bool):
+        """Setter for the input attribute of this Player, only changes the flying state on a new input"""
+        if not self.dead and value != self.__input:
+            self.__input = value
+            self.flying = value
 
     @property
     def dead(self) -> bool:
@@ -709,13 +963,27 @@ class Player(AnimatedSprite, InScreenSprite, AcceleratingSprite):
     @dead.setter
     def dead(self, value: bool):
         """Setter for the dead attribute of this Player"""
+        self.set_dead(value)
+
+    def set_dead(self, value: bool, effects: bool = True) -> None:
+        """Set if this Player is dead, the animation and sounds are left alone if effects is False"""
         self.__dead: bool = value
         if value:
-            self.restart((PlayerAnimationState.DEAD, None))
             self.ddy = self.FALL_ACCELERATION
 
-            self.death_sound.play()
-            self.jetpack_on_sound.stop()
+            if effects:
+                self.restart((PlayerAnimationState.DEAD, None))
+
+                self.play_sound(self.death_sound)
+                self.stop_sound(self.jetpack_on_sound)
+
+    def set_input(self, value: bool) -> None:
+        """Set the input of this Player without changing the flying state"""
+        self.__input = value
+
+    def set_jetpack(self, value: bool) -> None:
+        """Set if the jetpack of this Player fires without changing the flying state"""
+        self.__jetpack = value
 
     def update(self, *args):
         """update method for this Player"""
@@ -732,27 +1000,127 @@ class Player(AnimatedSprite, InScreenSprite, AcceleratingSprite):
 class Zapper(MovingSprite, KillIfOutOfScreenSprite):
     """A class representing zapper sprites, inherits from MovingSprite, KillIfOutOfScreenSprite"""
 
-    IMAGES: typing.Tuple[pygame.Surface, ...] = tuple(
-        next(helper.load_images(os.path.join("assets", "sprites", "zapper")))
+    IMAGES: loading.Asset[typing.Tuple[pygame.Surface, ...]] = loading.Asset.directory(
+        os.path.join("assets", "sprites", "zapper"),
+        packed=True
+    )
+
+    # The angles zappers are drawn at, spread over half a turn as zappers look the same upside down
+    # Every step keeps a rotated image and mask of each orientation, so fewer steps use less memory
+    ANGLE_STEPS: int = 24
+
+    # The images of the vertical zappers rotated to every angle step, made after the game starts as only higher tiers
+    # have angled zappers, or when first used if one comes sooner
+    ROTATIONS: loading.Asset[typing.Tuple[typing.Tuple[pygame.Surface, ...], ...]] = loading.Asset.derived(
+        lambda: tuple(loading.rotations(image, Zapper.ANGLE_STEPS, 180) for image in Zapper.IMAGES[:2])
     )
 
-    def __init__(self, orientation: bool = True, direction: bool = True, *groups, **kwargs):
+    # The pixels of the end caps at either end of the images, the beam between them is tiled to make longer zappers
+    CAP: int = 32
+
+    # Zapper images of other lengths by (length, orientation, direction), shared by every zapper of that length
+    ASSEMBLED: typing.Dict[typing.Tuple[int, bool, bool], pygame.Surface] = {}
+
+    def __init__(self, orientation: bool = True, direction: bool = True, *groups,
+                 angle: typing.Optional[float] = None, spin: float = 0.0, length: typing.Optional[int] = None,
+                 **kwargs):
 
         """
         Initializer for the Zapper class
         orientation: on if True, else False
-        direction: horizontal if True, else vertical
+        direction: vertical if True, else horizontal
+        angle: the degrees the zapper is rotated counterclockwise from vertical, replaces direction if not None
+        spin: the degrees the zapper rotates each frame
+        length: the length in pixels of a zapper that is not angled, the length of its image if None
         """
         super().__init__(image=self.IMAGES[0], *groups, **kwargs)
 
+        self.__length: typing.Optional[int] = length
+        self.__angle: typing.Optional[float] = None
+        self.__angle_index: int = -1
+        self.spin: float = spin
+
         self.orientation = orientation
         self.direction = direction
+        self.angle = angle
+
+    @staticmethod
+    def image_index(orientation: bool, direction: bool) -> int:
+        """Returns the index in IMAGES of the image of an orientation and direction"""
+        if orientation:
+            return 1 if direction else 3
+
+        return 0 if direction else 2
+
+    @classmethod
+    def assemble(cls, length: int, orientation: bool, direction: bool) -> pygame.Surface:
+        """
+        Returns the image of a zapper of a length, from the end caps of its image and its beam tiled between them
+        Images and their masks are made once and kept in ASSEMBLED
+        """
+        key = (length, orientation, direction)
+
+        try:
+            return cls.ASSEMBLED[key]
+        except KeyError:
+            pass
+
+        source = cls.IMAGES[cls.image_index(orientation, direction)]
+        width, height = source.get_size()
+
+        # Primary is the length along the beam
+        vertical = height >= width
+        primary = height if vertical else width
+
+        length = max(length, cls.CAP * 2)
+        beam = primary - cls.CAP * 2
+
+        def area(start: int, span: int) -> pygame.Rect:
+            return pygame.Rect(0, start, width, span) if vertical else pygame.Rect(start, 0, span, height)
+
+        image = pygame.Surface((width, length) if vertical else (length, height), pygame.SRCALPHA)
+
+        # The parts never overlap and the image starts fully transparent, so taking the maximum copies them exactly
+        parts = [(cls.CAP, 0, 0), (cls.CAP, primary - cls.CAP, length - cls.CAP)]
+        for offset in range(cls.CAP, length - cls.CAP, beam):
+            parts.append((min(beam, length - cls.CAP - offset), cls.CAP, offset))
+
+        for span, start, offset in parts:
+            image.blit(source, area(offset, span).topleft, area(start, span), special_flags=pygame.BLEND_RGBA_MAX)
+
+        image = loading.Loader.convert(image)
+        loading.mask(image)
+
+        cls.ASSEMBLED[key] = image
+
+        return image
 
     @classmethod
-    def random_spawn(cls, screen: pygame.Surface, *groups, **kwargs):
-        """Randomly spawns a zapper in a random location and orientation"""
-        instance = cls(screen=screen, position=(0, 0), direction=helper.chance(0.5), *groups, **kwargs)
-        instance.position = (screen.get_size()[0] - 1, random.randrange(0, screen.get_size()[1] - instance.size[1]))
+    def random_spawn(cls, screen: pygame.Surface, *groups, rng=random, angle_chance: float = 0.0,
+                     spin: float = 0.0, lengths: typing.Optional[typing.Tuple[int, int]] = None,
+                     length_step: int = 20, **kwargs):
+        """
+        Randomly spawns a zapper in a random location and orientation
+        angle_chance: the chance the zapper is at a random angle, no random numbers are drawn for it if 0
+        spin: the most degrees an angled zapper rotates each frame
+        lengths: the range of the length of a zapper that is not angled, in steps of length_step pixels,
+        no random numbers are drawn for it if None
+        """
+        direction = helper.chance(0.5, rng)
+
+        length = None
+        if lengths is not None:
+            length = rng.randrange(lengths[0], lengths[1] + 1, length_step)
+
+        # Angled zappers are the length of their images
+        if angle_chance and helper.chance(angle_chance, rng):
+            kwargs["angle"] = rng.uniform(0, 180)
+            kwargs["spin"] = rng.uniform(-spin, spin) if spin else 0.0
+        elif length is not None:
+            kwargs["length"] = length
+
+        instance = cls(screen=screen, position=(0, 0), direction=direction, *groups, **kwargs)
+        instance.position = (screen.get_size()[0] - 1, rng.randrange(0, screen.get_size()[1] - instance.size[1]))
 
         return instance
 
@@ -778,19 +1146,54 @@ class Zapper(MovingSprite, KillIfOutOfScreenSprite):
         self.__direction: bool = value
         self.__update_image()
 
+    @property
+    def length(self) -> typing.Optional[int]:
+        """Getter for the length attribute of this Zapper, None if it is the length of its image"""
+        return self.__length
+
+    @property
+    def angle(self) -> typing.Optional[float]:
+        """Getter for the angle attribute of this Zapper, None if it is horizontal or vertical"""
+        return self.__angle
+
+    @angle.setter
+    def angle(self, value: typing.Optional[float]):
+        """Setter for the angle attribute of this Zapper, only changes the image when the angle step changes"""
+        self.__angle = value
+
+        if value is None:
+            if self.__angle_index >= 0:
+                self.__angle_index = -1
+                self.__update_image()
+        else:
+            index = round(value * self.ANGLE_STEPS / 180) % self.ANGLE_STEPS
+
+            if index != self.__angle_index:
+                self.__angle_index = index
+                self.__update_image()
+
     def __update_image(self):
         """update_image method for this Zapper"""
         try:
-            if self.orientation:
-                if self.direction:
-                    self.image = self.IMAGES[1]
-                else:
-                    self.image = self.IMAGES[3]
+            if self.__angle_index >= 0:
+                # Rotate around the center, as the size of the image changes with the angle
+                center = self.rect.center
+                self.image = self.ROTATIONS[int(self.orientation)][self.__angle_index]
+                self.rect.center = center
+
+            elif self.__length is not None:
+                self.image = self.assemble(self.__length, self.orientation, self.direction)
+
             else:
-                if self.direction:
-                    self.image = self.IMAGES[0]
-                else:
-                    self.image = self.IMAGES[2]
+                self.image = self.IMAGES[self.image_index(self.orientation, self.direction)]
 
         except AttributeError:
             pass
+
+    def update(self, *args):
+        """update method for this Zapper"""
+        # Zappers only move, the edge checks of ScreenSprite are skipped and ScrollingGroup culls them
+        self.rect.move_ip(self.dx, self.dy)
+
+        if self.spin and self.__angle is not None:
+            self.angle = (self.__angle + self.spin) % 180
@@ -0,0 +1,108 @@
+"""Stress test of the hardest difficulty tier, runs headless"""
+
+import os
+import sys
+import time
+import random
+import typing
+import argparse
+
+# Run without a window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import env
+import render
+import world
+import loading
+import difficulty
+
+# The time of one frame at 60 Hz
+BUDGET: float = 1 / 60
+
+
+class Immortal(env.Agent):
+    """A class representing immortal sprites, agents that never die so the world keeps scrolling, inherits from Agent"""
+
+    def set_dead(self, value: bool, effects: bool = True) -> None:
+        """set_dead method for this Immortal"""
+        super().set_dead(False, effects)
+
+
+def stress(frames: int = 1200, players: int = 1, seed: int = 0,
+           curve: typing.Optional[difficulty.Difficulty] = None) -> typing.Dict[str, float]:
+    """Run the top tier of a difficulty curve headless, returns the frame time statistics in seconds"""
+    if curve is None:
+        curve = difficulty.Difficulty()
+
+    pygame.init()
+
+    loading.load_all()
+
+    screen = pygame.Surface(env.Environment.SCREEN_SIZE)
+    renderer = render.Renderer()
+
+    game_world = world.World(screen, seed, curve=curve)
+    game_world.pixels = curve.top.distance
+    game_world.apply_tier()
+
+    agents = [game_world.spawn_player(Immortal) for _ in range(players)]
+    policy = random.Random(seed)
+
+    times = []
+    most_zappers = 0
+
+    for _ in range(frames):
+        start = time.perf_counter()
+
+        for agent in agents:
+            if policy.random() < 0.05:
+                agent.act(env.FALL if agent.input else env.FLY)
+
+        game_world.step()
+        renderer.draw(screen, game_world.game_sprites, (game_world.exhaust,))
+
+        times.append(time.perf_counter() - start)
+        most_zappers = max(most_zappers, len(game_world.zappers))
+
+    times.sort()
+
+    return {
+        "frames": frames,
+        "mean": sum(times) / len(times),
+        "p50": times[len(times) // 2],
+        "p99": times[min(len(times) * 99 // 100, len(times) - 1)],
+        "max": times[-1],
+        "over_budget": sum(frame_time > BUDGET for frame_time in times),
+        "most_zappers": most_zappers
+    }
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Run the stress test and report if the 99th percentile frame time fits in the 60 Hz budget"""
+    parser = argparse.ArgumentParser(description="Stress test of the hardest difficulty tier")
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--players", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    curve = difficulty.Difficulty()
+    result = stress(args.frames, args.players, args.seed, curve)
+
+    print("Tier: %r" % (curve.top,))
+    print("Frames: %d, most zappers: %d" % (result["frames"], result["most_zappers"]))
+    print("Frame time: mean %.2f ms, p50 %.2f ms, p99 %.2f ms, max %.2f ms" % (
+        result["mean"] * 1000, result["p50"] * 1000, result["p99"] * 1000, result["max"] * 1000
+    ))
+    print("Frames over the %.2f ms budget: %d" % (BUDGET * 1000, result["over_budget"]))
+
+    holds = result["p99"] <= BUDGET
+    print("60 Hz budget holds" if holds else "60 Hz budget does not hold")
+
+    return 0 if holds else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
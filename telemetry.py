@@ -0,0 +1,284 @@
+"""Telemetry of play sessions"""
+
+import os
+import json
+import time
+import queue
+import typing
+import threading
+
+import world
+import resources
+
+
+class Histogram:
+    """A class representing histograms with a fixed amount of equal bins, values past the last bin overflow"""
+
+    def __init__(self, bins: int = 50, width: float = 1.0):
+        """
+        Initializer for the Histogram class
+        bins: the amount of bins
+        width: the width of every bin
+        """
+        self.width: float = width
+        self.counts: typing.List[int] = [0] * bins
+        self.overflow: int = 0
+
+        self.total: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+
+    def add(self, value: float) -> None:
+        """Count a value"""
+        index = int(value // self.width)
+
+        if index < len(self.counts):
+            self.counts[index] += 1
+        else:
+            self.overflow += 1
+
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def reset(self) -> None:
+        """Clear every count"""
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+
+        self.overflow = 0
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def to_dict(self) -> dict:
+        """Returns this Histogram as a dict that could be written as JSON"""
+        return {
+            "width": self.width,
+            "counts": list(self.counts),
+            "overflow": self.overflow,
+            "total": self.total,
+            "mean": self.sum / self.total if self.total else 0.0,
+            "max": self.max
+        }
+
+
+class Writer:
+    """
+    A class representing writers, which write records as lines of JSON from a background thread
+    The file is rotated once it gets too big, keeping a few old files
+    """
+
+    def __init__(self, directory: str, name: str = "telemetry", max_bytes: int = 1 << 20, backups: int = 5):
+        """
+        Initializer for the Writer class
+        max_bytes: the size a file is rotated at
+        backups: the amount of old files kept
+        """
+        self.directory: str = directory
+        self.name: str = name
+        self.max_bytes: int = max_bytes
+        self.backups: int = backups
+
+        self.__records: "queue.SimpleQueue[typing.Optional[dict]]" = queue.SimpleQueue()
+        self.__thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> str:
+        """Getter for the path attribute of this Writer, the file being written to"""
+        return os.path.join(self.directory, self.name + ".jsonl")
+
+    def start(self) -> None:
+        """Start the writer thread"""
+        self.__thread = threading.Thread(target=self.__write_records, name="Telemetry", daemon=True)
+        self.__thread.start()
+
+    def write(self, record: dict) -> None:
+        """Queue a record to be written, never blocks"""
+        self.__records.put(record)
+
+    def close(self) -> None:
+        """Write the queued records and stop the writer thread"""
+        if self.__thread is not None:
+            self.__records.put(None)
+            self.__thread.join()
+            self.__thread = None
+
+    def __rotate(self) -> None:
+        """rotate method for this Writer"""
+        for index in range(self.backups - 1, 0, -1):
+            source = "%s.%d" % (self.path, index)
+            if os.path.exists(source):
+                os.replace(source, "%s.%d" % (self.path, index + 1))
+
+        if self.backups > 0:
+            os.replace(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+
+    def __write_records(self) -> None:
+        """write_records method for this Writer, runs in the writer thread"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        while True:
+            record = self.__records.get()
+
+            if record is None:
+                break
+
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self.__rotate()
+            except OSError:
+                pass
+
+            with open(self.path, "a") as file:
+                file.write(line)
+
+
+class Telemetry:
+    """
+    A class representing telemetry, metrics of play sessions aggregated in the game loop
+    Records are written by a Writer, so recording a frame never waits on the disk
+    """
+
+    def __init__(self, writer: Writer, frame_rate: int = 60, interval: float = 10.0):
+        """
+        Initializer for the Telemetry class
+        frame_rate: the frame rate the game runs at, frames taking longer drop frames
+        interval: the seconds between interval records
+        """
+        self.writer: Writer = writer
+        self.frame_rate: int = frame_rate
+        self.interval: float = interval
+
+        self.frame_times: Histogram = Histogram(50, 1.0)
+        self.input_latencies: Histogram = Histogram(100, 1.0)
+        self.sprite_counts: typing.Dict[str, Histogram] = {}
+
+        self.__session: int = 0
+        self.__session_frames: int = 0
+        self.__session_dropped: int = 0
+        self.__session_start: float = time.time()
+
+        self.__interval_frames: int = 0
+        self.__interval_dropped: int = 0
+        self.__interval_start: float = time.monotonic()
+
+        self.__ended: bool = False
+
+    def start(self) -> None:
+        """Start writing records"""
+        self.writer.start()
+
+    def frame(self, frame_time: int, game_world: world.World, input_latency: typing.Optional[float] = None) -> None:
+        """
+        Record a frame
+        frame_time: the milliseconds the frame took, like pygame.time.Clock.get_time
+        input_latency: the milliseconds from an input to the frame showing it, if it showed one
+        """
+        self.frame_times.add(frame_time)
+
+        if input_latency is not None:
+            self.input_latencies.add(input_latency)
+
+        # A frame that took two frames of time dropped one
+        dropped = max(round(frame_time * self.frame_rate / 1000) - 1, 0)
+
+        self.__session_frames += 1
+        self.__session_dropped += dropped
+        self.__interval_frames += 1
+        self.__interval_dropped += dropped
+
+        for name, group in (("players", game_world.players), ("zappers", game_world.zappers),
+                            ("sprites", game_world.game_sprites)):
+            try:
+                histogram = self.sprite_counts[name]
+            except KeyError:
+                histogram = self.sprite_counts[name] = Histogram(64, 1.0)
+
+            histogram.add(len(group))
+
+        if time.monotonic() - self.__interval_start >= self.interval:
+            self.flush_interval(game_world)
+
+        if game_world.over and not self.__ended:
+            self.end_session(game_world)
+
+    def flush_interval(self, game_world: world.World) -> None:
+        """Queue an interval record, the frames since the last one"""
+        self.writer.write({
+            "type": "interval",
+            "time": time.time(),
+            "session": self.__session,
+            "frames": self.__interval_frames,
+            "dropped_frames": self.__interval_dropped,
+            "sprites": len(game_world.game_sprites)
+        })
+
+        self.__interval_frames = 0
+        self.__interval_dropped = 0
+        self.__interval_start = time.monotonic()
+
+    def memory(self, memory_report: resources.Report) -> None:
+        """
+        Queue a memory record of a report that was made already, like by a resources.Budget
+        Reports walk every sprite, so they are never made while recording frames
+        """
+        self.writer.write({
+            "type": "memory",
+            "time": time.time(),
+            "session": self.__session,
+            **memory_report.to_dict()
+        })
+
+    def end_session(self, game_world: world.World) -> None:
+        """Queue the record of the session and start a new one"""
+        deaths = []
+
+        for player, scoreboard in game_world.scoreboards.items():
+            killer = game_world.killers.get(player)
+
+            deaths.append({
+                "distance": scoreboard.distance,
+                "dead": player.dead,
+                "killer": None if killer is None else killer._asdict()
+            })
+
+        self.writer.write({
+            "type": "session",
+            "time": time.time(),
+            "session": self.__session,
+            "duration": time.time() - self.__session_start,
+            "frames": self.__session_frames,
+            "dropped_frames": self.__session_dropped,
+            "frame_time_ms": self.frame_times.to_dict(),
+            "input_latency_ms": self.input_latencies.to_dict(),
+            "sprite_counts": {name: histogram.to_dict() for name, histogram in self.sprite_counts.items()},
+            "players": deaths
+        })
+
+        self.frame_times.reset()
+        self.input_latencies.reset()
+        for histogram in self.sprite_counts.values():
+            histogram.reset()
+
+        self.__session += 1
+        self.__session_frames = 0
+        self.__session_dropped = 0
+        self.__session_start = time.time()
+
+        self.__ended = game_world.over
+
+    def close(self, game_world: typing.Optional[world.World] = None) -> None:
+        """End the session if it was not ended and record the memory of the world, then write every queued record"""
+        if game_world is not None:
+            if not self.__ended:
+                self.end_session(game_world)
+
+            self.memory(resources.report(game_world))
+
+        self.writer.close()
@@ -0,0 +1,323 @@
+"""Game World"""
+
+import os
+import random
+import typing
+
+import pygame
+
+import helper
+import loading
+import sprites
+import particles
+import difficulty
+
+
+class Killer(typing.NamedTuple):
+    """A class representing killers, what is kept of the zapper that killed a player once it is gone"""
+
+    orientation: bool
+
+    # "horizontal" or "vertical", from the shape of the zapper when it killed
+    direction: str
+
+    # The degrees the zapper was rotated, None if it was not angled
+    angle: typing.Optional[float]
+
+    # The size in pixels of the zapper
+    size: typing.Tuple[int, int]
+
+    @classmethod
+    def of(cls, zapper: sprites.Zapper) -> "Killer":
+        """Returns the killer of a zapper"""
+        width, height = zapper.rect.size
+
+        return cls(zapper.orientation, "horizontal" if width > height else "vertical", zapper.angle, (width, height))
+
+
+class World:
+    """A class representing game worlds, the obstacles and backgrounds shared by every player of a run"""
+
+    BACKGROUND_IMAGES: loading.Asset[typing.List[typing.List[pygame.Surface]]] = loading.Asset.directories(
+        os.path.join("assets", "background")
+    )
+
+    SPEED: int = 8
+    ZAPPER_SPACINGS: typing.Tuple[int, int] = (300, 500)
+
+    # Exhaust particles emitted per frame by every flying player
+    EXHAUST_RATE: float = 6.0
+
+    def __init__(self, screen: pygame.Surface, seed: typing.Optional[int] = None,
+                 speed: int = SPEED, zapper_spacings: typing.Tuple[int, int] = ZAPPER_SPACINGS,
+                 curve: typing.Optional[difficulty.Difficulty] = None, exhaust: bool = True):
+        """
+        Initializer for the World class
+        seed: seed of the obstacle stream, random if None
+        speed: pixels the world scrolls per frame
+        curve: the difficulty curve, which replaces speed and zapper_spacings as the world scrolls if it is given
+        exhaust: if flying players emit jetpack exhaust particles
+        """
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        self.screen: pygame.Surface = screen
+        self.seed: int = seed
+        self.random: random.Random = random.Random(seed)
+
+        # Speed
+        self.speed: int = speed
+        self.dx: int = speed
+
+        # Background
+        self.backgrounds = pygame.sprite.Group(
+            sprites.BackgroundSprite(screen=screen, images=images, velocity=(0, 0))
+            for images in self.BACKGROUND_IMAGES
+        )
+
+        # Players
+        self.players = pygame.sprite.Group()
+
+        # Zappers
+        self.base_zapper_spacings: typing.Tuple[int, int] = zapper_spacings
+        self.zapper_spacings: typing.Tuple[int, int] = zapper_spacings
+        self.zapper_pattern: int = 1
+        self.zapper_angle_chance: float = 0.0
+        self.zapper_spin: float = 0.0
+        self.zapper_lengths: typing.Optional[typing.Tuple[int, int]] = None
+        self.zappers = sprites.ScrollingGroup(screen)
+
+        # Scoreboards
+        self.scoreboards: typing.Dict[sprites.Player, sprites.Scoreboard] = {}
+        self.scoreboard_sprites = pygame.sprite.Group()
+
+        # Jetpack exhaust, seeded separately so it never changes the obstacle stream
+        self.exhaust: typing.Optional[particles.Particles] = particles.Particles(seed=seed) if exhaust else None
+
+        # The zapper that killed each dead player, kept as plain data so the zapper is freed once culled
+        self.killers: typing.Dict[sprites.Player, Killer] = {}
+
+        # Game Over
+        self.game_over = sprites.TextSprite(
+            position=(0, 0),
+            font=helper.default_font(48, bold=True),
+            text="GAME OVER!",
+            color=pygame.Color(255, 255, 255, 255),
+            antialias=True
+        )
+
+        self.game_over.horizontally_center(0, screen.get_size()[0])
+        self.game_over.vertically_center(0, screen.get_size()[1])
+
+        # Groups
+        self.background_sprites = [self.backgrounds, self.zappers]
+        self.foreground_sprites = [self.players, self.scoreboard_sprites]
+
+        self.all_sprites = [self.background_sprites, self.foreground_sprites]
+        self.game_sprites = sprites.ActivityGroup(self.all_sprites)
+
+        # Difficulty
+        self.curve: typing.Optional[difficulty.Difficulty] = curve
+        self.pixels: int = 0
+        self.apply_tier()
+
+        self.next_zapper_spacing: int = self.random.randint(*self.zapper_spacings)
+        self.zapper_distance: int = 0
+
+        self.ticks: int = 0
+
+    def reset(self, seed: typing.Optional[int] = None) -> None:
+        """
+        Start a new run in this World without any players, like a new World of the same screen, speed and curve
+        The backgrounds, whose images are slow to make, and the groups are kept
+        seed: seed of the obstacle stream, random if None
+        """
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        self.seed = seed
+        self.random.seed(seed)
+
+        self.dx = self.speed
+
+        for background in self.backgrounds:
+            background.exact_position = (0, 0)
+            background.velocity = (0, 0)
+
+        self.players.empty()
+
+        self.zapper_spacings = self.base_zapper_spacings
+        self.zapper_pattern = 1
+        self.zapper_angle_chance = 0.0
+        self.zapper_spin = 0.0
+        self.zapper_lengths = None
+        self.zappers.empty()
+
+        self.scoreboards.clear()
+        self.scoreboard_sprites.empty()
+
+        if self.exhaust is not None:
+            self.exhaust.clear(seed)
+
+        self.killers.clear()
+
+        self.game_sprites.empty()
+        self.game_sprites.add(self.all_sprites)
+
+        self.pixels = 0
+        self.apply_tier()
+
+        self.next_zapper_spacing = self.random.randint(*self.zapper_spacings)
+        self.zapper_distance = 0
+
+        self.ticks = 0
+
+    @property
+    def over(self) -> bool:
+        """Getter for the over attribute of this World, True once every player is dead"""
+        return self.game_sprites.has(self.game_over)
+
+    @property
+    def player_position(self) -> typing.Tuple[int, int]:
+        """Getter for the player_position attribute of this World, where players start"""
+        return round(self.screen.get_size()[0] * (1 / 8)), 0
+
+    def add_player(self, player: sprites.Player, name: typing.Optional[str] = None) -> sprites.Scoreboard:
+        """Add a player to this World, returns the scoreboard of the player"""
+        if name is None:
+            score_text = "Distance: %d"
+        else:
+            score_text = name + ": %d"
+
+        scoreboard = sprites.Scoreboard(score_text=score_text)
+
+        # Stack the scoreboards in columns down the left of the screen
+        rows = max(self.screen.get_size()[1] // scoreboard.size[1], 1)
+        index = len(self.scoreboards)
+        scoreboard.position = ((index // rows) * 200, (index % rows) * scoreboard.size[1])
+
+        self.players.add(player)
+        self.scoreboards[player] = scoreboard
+        self.scoreboard_sprites.add(scoreboard)
+
+        return scoreboard
+
+    def spawn_player(self, cls: typing.Type[sprites.Player] = sprites.Player, name: typing.Optional[str] = None,
+                     **kwargs) -> sprites.Player:
+        """Create a player at the starting position and add it to this World"""
+        player = cls(screen=self.screen, position=self.player_position, **kwargs)
+        player.flying = False
+
+        self.add_player(player, name)
+
+        return player
+
+    def collide(self) -> typing.List[typing.Tuple[sprites.Player, sprites.Zapper]]:
+        """
+        Returns the living players touching a zapper
+        The rects of every living player are tested against each zapper in one batch before precise collisions
+        """
+        living = [player for player in self.players if not player.dead]
+
+        if not living:
+            return []
+
+        rects = [player.rect for player in living]
+        collisions = []
+
+        for zapper in self.zappers:
+            for index in zapper.rect.collidelistall(rects):
+                player = living[index]
+
+                if pygame.sprite.collide_mask(player, zapper):
+                    collisions.append((player, zapper))
+
+        return collisions
+
+    @property
+    def tier(self) -> typing.Optional[difficulty.Tier]:
+        """Getter for the tier attribute of this World, None if it has no difficulty curve"""
+        if self.curve is None:
+            return None
+
+        return self.curve.tier(self.pixels)
+
+    def apply_tier(self) -> None:
+        """Set the speed and zapper spacings to the tier of the distance scrolled"""
+        tier = self.tier
+
+        if tier is not None and not self.over:
+            self.dx = tier.speed
+            self.zapper_spacings = tier.zapper_spacings
+            self.zapper_pattern = tier.pattern
+            self.zapper_angle_chance = tier.angle_chance
+            self.zapper_spin = tier.spin
+            self.zapper_lengths = tier.lengths
+
+    def step(self) -> None:
+        """Advance this World by one frame"""
+        self.apply_tier()
+
+        dx = self.dx
+
+        # Update speed of background sprites
+        for group in self.background_sprites:
+            for sprite in group:
+                if isinstance(sprite, sprites.MovingSprite):
+                    sprite.dx = -dx
+
+        background_speed = -dx
+
+        # Update speed of backgrounds, exact as their positions keep fractions of pixels
+        for sprite in reversed(list(self.backgrounds)):
+            background_speed *= (3 / 4)
+            sprite.dx = background_speed
+
+        # Spawn Zapper
+        if self.zapper_distance > self.next_zapper_spacing:
+            self.zapper_distance = 0
+
+            for _ in range(self.zapper_pattern):
+                self.zappers.add(sprites.Zapper.random_spawn(
+                    screen=self.screen, velocity=(-dx, 0), rng=self.random, angle_chance=self.zapper_angle_chance,
+                    spin=self.zapper_spin, lengths=self.zapper_lengths
+                ))
+
+            self.next_zapper_spacing = self.random.randint(*self.zapper_spacings)
+
+        self.zapper_distance += dx
+        self.pixels += dx
+
+        # Add new sprites
+        self.game_sprites.add(self.all_sprites)
+
+        # Check collisions
+        for player, zapper in self.collide():
+            if not player.dead:
+                player.dead = True
+                self.killers[player] = Killer.of(zapper)
+
+        # Check if all players are dead
+        if all(map(lambda x: x.dead, self.players)):
+            self.dx = 0
+            self.game_sprites.add(self.game_over)
+
+        # Update Scoreboards
+        for player, scoreboard in self.scoreboards.items():
+            if not player.dead:
+                scoreboard.pixels += self.dx
+
+        self.game_sprites.update()
+        self.zappers.cull()
+
+        # Jetpack exhaust, from the back of every flying player
+        if self.exhaust is not None:
+            self.exhaust.update(dx)
+
+            for player in self.players:
+                if player.jetpack:
+                    rect = player.rect
+                    self.exhaust.emit(self.EXHAUST_RATE, (rect.left + rect.width / 5, rect.bottom - rect.height / 8),
+                                      (0, 4), (0.8, 1.5))
+
+        self.ticks += 1